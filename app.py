@@ -1,14 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, Response
+from flask import Flask, stream_with_context, before_render_template, template_rendered, render_template, abort, request, redirect, url_for, session, flash, send_file, Response, g, jsonify
 import mysql.connector
 import io
+import os
 import csv
+import base64
+import json
+import time
+import tempfile
+import itertools
+import mimetypes
+import queue
 from openpyxl import Workbook
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
-from config import DB_CONFIG, SECRET_KEY, DEBUG, HEADLINES_PER_PAGE
-from scraper import scrape_all_sources
-from datetime import datetime
+from config import (SECRET_KEY, DEBUG, HEADLINES_PER_PAGE, COUNT_CACHE_TTL, EXPORT_CHUNK_SIZE, SCHEDULER_ENABLED, API_MAX_AGE, IMAGE_PROXY_ENABLED,
+                    ASSET_BUILD_ON_STARTUP, COMPRESS_MIN_SIZE, COMPRESS_LEVEL,
+                    LIVE_HEARTBEAT_INTERVAL, LIVE_MAX_STREAM_SECONDS, READ_YOUR_WRITES_SECONDS)
+from scheduler import scheduler, get_scrape_status
+from db import get_pool, get_router
+from visit_logger import visit_logger
+from cache import cache, get_or_set
+from rollups import get_visit_trends
+from retention import iter_archived_visits
+from images import sign_url, verify_url, get_thumbnail, thumbnails
+from live import hub, format_event
+from assets import DIST_DIR, build_assets, load_manifest, pick_variant, pick_encoding, compress_body
+from profiling import metrics, RequestProfile, ProfiledConnection, should_profile, start_profiler, save_profile
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
@@ -16,7 +35,289 @@ app.config['DEBUG'] = DEBUG
 
 # Database connection
 def get_db():
-    return mysql.connector.connect(**DB_CONFIG)
+    """Return this request's pooled connection, checking one out on first use."""
+    if 'db' not in g:
+        conn = get_pool().acquire()
+        profile = g.get('profile')
+        g.db = ProfiledConnection(conn, profile) if profile is not None else conn
+    return g.db
+
+def get_read_db():
+    """Connection for read-only queries: a healthy replica, else the primary (get_db()).
+
+    A session that wrote in the last READ_YOUR_WRITES_SECONDS reads from
+    the primary so it sees its own changes despite replication lag.
+    """
+    if 'read_db' not in g:
+        if wrote_recently():
+            return get_db()
+        replica = get_router().acquire_replica()
+        if replica is None:
+            return get_db()
+        pool, conn = replica
+        profile = g.get('profile')
+        g.read_pool = pool
+        g.read_db = ProfiledConnection(conn, profile) if profile is not None else conn
+    return g.read_db
+
+def mark_write():
+    """Route this session's reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    session['wrote_at'] = time.time()
+
+def wrote_recently():
+    return time.time() - session.get('wrote_at', 0) < READ_YOUR_WRITES_SECONDS
+
+@app.before_request
+def start_scheduler():
+    if SCHEDULER_ENABLED:
+        scheduler.ensure_started()
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(getattr(conn, 'raw', conn))
+    conn = g.pop('read_db', None)
+    if conn is not None:
+        g.pop('read_pool').release(getattr(conn, 'raw', conn))
+
+# ==================== REQUEST PROFILING ====================
+@app.before_request
+def start_request_profile():
+    g.profile = RequestProfile()
+    route = request.url_rule.rule if request.url_rule else None
+    if should_profile(route, forced=app.debug and '_profile' in request.args):
+        start_profiler(g.profile)
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    if profile.profiler is not None:
+        path = save_profile(profile, request.endpoint)
+        app.logger.info("Profile for %s saved to %s", request.path, path)
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    metrics.observe(route, request.method, response.status_code, profile)
+    response.headers['Server-Timing'] = profile.server_timing()
+    return response
+
+@app.teardown_request
+def stop_request_profiler(exc):
+    # after_request is skipped when a request raises; don't leave cProfile on
+    profile = g.pop('profile', None)
+    if profile is not None and profile.profiler is not None:
+        profile.profiler.disable()
+        profile.profiler = None
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def stop_template_timer(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    profile = g.get('profile')
+    if started is not None and profile is not None:
+        # Includes any queries made from template filters
+        profile.template_time += time.perf_counter() - started
+
+# ==================== STATIC ASSETS & COMPRESSION ====================
+# Fingerprinted names of static/*.css and *.js (see assets.py)
+asset_manifest = build_assets() if ASSET_BUILD_ON_STARTUP else load_manifest()
+asset_files = set(asset_manifest.values())
+
+COMPRESSIBLE_TYPES = {'text/html', 'text/plain', 'text/css', 'text/csv',
+                      'application/json', 'application/javascript', 'image/svg+xml'}
+
+def accepted_encodings():
+    return {value for value, quality in request.accept_encodings if quality > 0}
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static file, fingerprinted when it is in the asset manifest."""
+    hashed = asset_manifest.get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('asset', filename=hashed)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    if filename not in asset_files:
+        abort(404)
+    path, encoding = pick_variant(os.path.join(DIST_DIR, filename), accepted_encodings())
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # The name changes whenever the content does
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress buffered text responses above COMPRESS_MIN_SIZE bytes.
+
+    Each encoding is a different representation, so a strong ETag gets the
+    encoding appended inside the quotes ("abc-gzip") and If-None-Match is
+    re-checked against that.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    # A 304 from make_conditional() still holds the body until it is sent
+    data = response.get_data()
+    encoding = pick_encoding(accepted_encodings()) if len(data) >= COMPRESS_MIN_SIZE else None
+    if encoding is None:
+        return response
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+        if response.status_code in (200, 304):
+            # The view compared If-None-Match with the uncompressed ETag
+            response.status_code = 200
+            response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    response.set_data(compress_body(data, encoding, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# ==================== PAGINATION HELPERS ====================
+def encode_cursor(headline):
+    """Build an opaque page token from a headline's (publish_date, headline_id)."""
+    publish_date = headline['publish_date']
+    raw = f"{publish_date.isoformat() if publish_date else ''}|{headline['headline_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Return (publish_date, headline_id) from a page token, or None if invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        date_part, id_part = raw.split('|')
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+# The query builders below are shared with the async routes in asgi.py
+CATEGORIES_QUERY = "SELECT * FROM categories ORDER BY category_name"
+
+def headline_count_query(category_id=None):
+    # Read the ingest-time counters instead of scanning news_headlines
+    if category_id:
+        return "SELECT headline_count as total FROM category_counts WHERE category_id = %s", (category_id,)
+    return "SELECT COALESCE(SUM(headline_count), 0) as total FROM category_counts", ()
+
+def get_headline_count(cursor, category_id=None):
+    """Return the headline total for a category, cached for COUNT_CACHE_TTL seconds."""
+    def count():
+        cursor.execute(*headline_count_query(category_id))
+        row = cursor.fetchone()
+        return int(row['total']) if row else 0
+    return get_or_set(f"headlines:count:{category_id}", count, ttl=COUNT_CACHE_TTL)
+
+def get_categories(cursor):
+    """Return all categories for the filter buttons (cached)."""
+    def load():
+        cursor.execute(CATEGORIES_QUERY)
+        return cursor.fetchall()
+    return get_or_set("categories", load)
+
+def headlines_query(category_id=None, page=1, after=None, before=None):
+    """Build the query for one page of headlines, newest first.
+
+    `after`/`before` are page tokens from encode_cursor(); when given, the
+    page is located with a keyset seek on (publish_date, headline_id) so deep
+    pages cost the same as the first. Without a token, `page` falls back to
+    an OFFSET scan. Returns (query, params, after_pos, before_pos).
+    """
+    where = []
+    params = []
+    if category_id:
+        where.append("h.category_id = %s")
+        params.append(category_id)
+    
+    after_pos = decode_cursor(after)
+    before_pos = decode_cursor(before) if not after_pos else None
+    order = "DESC"
+    offset = 0
+    if after_pos:
+        where.append("(h.publish_date < %s OR (h.publish_date = %s AND h.headline_id < %s))")
+        params.extend([after_pos[0], after_pos[0], after_pos[1]])
+    elif before_pos:
+        where.append("(h.publish_date > %s OR (h.publish_date = %s AND h.headline_id > %s))")
+        params.extend([before_pos[0], before_pos[0], before_pos[1]])
+        order = "ASC"
+    else:
+        offset = (max(page, 1) - 1) * HEADLINES_PER_PAGE
+    
+    query = f"""
+        SELECT h.*, s.source_name, c.category_name, c.category_icon
+        FROM news_headlines h
+        JOIN news_sources s ON h.source_id = s.source_id
+        JOIN categories c ON h.category_id = c.category_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY h.publish_date {order}, h.headline_id {order}
+        LIMIT %s OFFSET %s
+    """
+    # Fetch one extra row to learn whether another page exists
+    return query, (*params, HEADLINES_PER_PAGE + 1, offset), after_pos, before_pos
+
+def headlines_page(rows, page, after_pos, before_pos):
+    """Turn the rows of headlines_query() into a page with its next/prev tokens."""
+    has_more = len(rows) > HEADLINES_PER_PAGE
+    headlines = rows[:HEADLINES_PER_PAGE]
+    if before_pos:
+        headlines.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(after_pos) or page > 1
+    
+    return {
+        'headlines': headlines,
+        'next_cursor': encode_cursor(headlines[-1]) if headlines and has_next else None,
+        'prev_cursor': encode_cursor(headlines[0]) if headlines and has_prev else None,
+    }
+
+def fetch_headlines(cursor, category_id=None, page=1, after=None, before=None):
+    """Fetch one page of headlines (see headlines_query())."""
+    query, params, after_pos, before_pos = headlines_query(category_id, page, after, before)
+    cursor.execute(query, params)
+    result = headlines_page(cursor.fetchall(), page, after_pos, before_pos)
+    attach_story_sources(cursor, result['headlines'])
+    return result
+
+def story_sources_query(headline_ids):
+    placeholders = ', '.join(['%s'] * len(headline_ids))
+    # An outlet may carry a story under several URLs; link one per outlet
+    return f"""
+        SELECT ss.headline_id, s.source_name, MIN(ss.url) AS url
+        FROM story_sources ss
+        JOIN news_sources s ON ss.source_id = s.source_id
+        WHERE ss.headline_id IN ({placeholders})
+        GROUP BY ss.headline_id, ss.source_id, s.source_name
+    """, list(headline_ids)
+
+def set_story_sources(headlines, rows):
+    """Set h['also_on'] from the rows of story_sources_query()."""
+    by_id = {h['headline_id']: h for h in headlines}
+    for h in headlines:
+        h['also_on'] = []
+    for row in rows:
+        by_id[row['headline_id']]['also_on'].append(row)
+
+def attach_story_sources(cursor, headlines):
+    """Set h['also_on'] to the other outlets carrying each story (one query)."""
+    rows = []
+    if headlines:
+        cursor.execute(*story_sources_query([h['headline_id'] for h in headlines]))
+        rows = cursor.fetchall()
+    set_story_sources(headlines, rows)
 
 # ==================== HOME PAGE ====================
 @app.route('/')
@@ -26,62 +327,232 @@ def index():
         log_visit("Homepage")
     except Exception:
         pass
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor(dictionary=True)
     
-    # Get page number and category filter
+    # Get page number, page token and category filter
     page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', None)
+    before = request.args.get('before', None)
     category_filter = request.args.get('category', None)
-    offset = (page - 1) * HEADLINES_PER_PAGE
     
     # Get all categories for filter buttons
-    cursor.execute("SELECT * FROM categories ORDER BY category_name")
-    categories = cursor.fetchall()
+    categories = get_categories(cursor)
     
-    # Build query based on category filter
+    category_id = None
     if category_filter:
-        count_query = "SELECT COUNT(*) as total FROM news_headlines h JOIN categories c ON h.category_id = c.category_id WHERE c.category_name = %s"
-        cursor.execute(count_query, (category_filter,))
-        total = cursor.fetchone()['total']
-        
-        query = """
-            SELECT h.*, s.source_name, c.category_name, c.category_icon
-            FROM news_headlines h
-            JOIN news_sources s ON h.source_id = s.source_id
-            JOIN categories c ON h.category_id = c.category_id
-            WHERE c.category_name = %s
-            ORDER BY h.publish_date DESC
-            LIMIT %s OFFSET %s
-        """
-        cursor.execute(query, (category_filter, HEADLINES_PER_PAGE, offset))
+        category_id = next((c['category_id'] for c in categories
+                            if c['category_name'] == category_filter), None)
+    
+    if category_filter and category_id is None:
+        # Unknown category: nothing to show
+        result = {'headlines': [], 'next_cursor': None, 'prev_cursor': None}
+        total = 0
     else:
-        # Get total count
-        cursor.execute("SELECT COUNT(*) as total FROM news_headlines")
-        total = cursor.fetchone()['total']
-        
-        # Get headlines with source and category info
-        query = """
-            SELECT h.*, s.source_name, c.category_name, c.category_icon
-            FROM news_headlines h
-            JOIN news_sources s ON h.source_id = s.source_id
-            JOIN categories c ON h.category_id = c.category_id
-            ORDER BY h.publish_date DESC
-            LIMIT %s OFFSET %s
-        """
-        cursor.execute(query, (HEADLINES_PER_PAGE, offset))
+        total = get_headline_count(cursor, category_id)
+        result = get_or_set(
+            f"headlines:page:{category_id}:{page}:{after}:{before}",
+            lambda: fetch_headlines(cursor, category_id, page, after, before)
+        )
     
-    headlines = cursor.fetchall()
+    headlines = result['headlines']
     total_pages = (total + HEADLINES_PER_PAGE - 1) // HEADLINES_PER_PAGE
     
+    # Load the user's favorites for the visible cards in one query
+    favorite_ids = set()
+    if 'user_id' in session:
+        favorite_ids = get_favorite_ids(cursor, session['user_id'],
+                                        [h['headline_id'] for h in headlines])
+    
     cursor.close()
-    conn.close()
     
     return render_template('index.html', 
                          headlines=headlines, 
                          categories=categories,
                          current_category=category_filter,
                          page=page, 
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         next_cursor=result['next_cursor'],
+                         prev_cursor=result['prev_cursor'],
+                         favorite_ids=favorite_ids,
+                         live_stream=live_stream_available(),
+                         live_last_id=max((h['headline_id'] for h in headlines), default=0))
+
+# ==================== LIVE HEADLINES ====================
+def live_stream_available():
+    """Whether this server can hold a stream open without blocking other requests.
+
+    A sync worker serves one request at a time, so pages only subscribe
+    under a threaded worker (the Procfile's gthread) or asgi.py.
+    """
+    return bool(request.environ.get('wsgi.multithread'))
+
+def live_card(event):
+    """A live event with the thumbnail URL the card template would use."""
+    return dict(event, thumbnail_url=thumbnail_url(event['image_url']) if event['image_url'] else None)
+
+@app.route('/stream/headlines')
+def headline_stream():
+    """Server-Sent Events stream of newly scraped headlines (see live.py).
+
+    Resumes after the Last-Event-ID header, or ?last_id= on the first
+    connect, from the replay buffer. ?category= limits the stream to one
+    category. asgi.py serves this route natively on its event loop.
+    """
+    if not live_stream_available():
+        return Response('Live stream needs a threaded worker', status=503, mimetype='text/plain')
+    category_filter = request.args.get('category', None)
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_id'))
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+    
+    category_id = None
+    if category_filter:
+        cursor = get_read_db().cursor(dictionary=True)
+        categories = get_categories(cursor)
+        cursor.close()
+        category_id = next((c['category_id'] for c in categories
+                            if c['category_name'] == category_filter), None)
+        if category_id is None:
+            abort(404)
+    # Don't hold a pooled connection for the life of the stream
+    release_db(None)
+    
+    subscribed = hub.subscribe(category_id, last_id)
+    if subscribed is None:
+        return Response('Too many live connections', status=503, headers={'Retry-After': '30'},
+                        mimetype='text/plain')
+    sub, replay = subscribed
+    
+    def generate():
+        try:
+            # Browsers reconnect after this many ms, sending Last-Event-ID
+            yield f"retry: {LIVE_HEARTBEAT_INTERVAL * 1000}\n\n"
+            for event in replay:
+                yield format_event(live_card(event))
+            deadline = time.monotonic() + LIVE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event = sub.queue.get(timeout=LIVE_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    # Comment line: keeps proxies from timing out an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break  # fell behind; the client resumes from the replay buffer
+                yield format_event(live_card(event))
+        finally:
+            hub.unsubscribe(sub)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: flush each event
+    return response
+
+# ==================== SEARCH ====================
+def get_sources(cursor):
+    """Return all news sources for the search filter (cached)."""
+    def load():
+        cursor.execute("SELECT source_id, source_name FROM news_sources ORDER BY source_name")
+        return cursor.fetchall()
+    return get_or_set("sources", load)
+
+def search_headlines(cursor, q, category_id=None, source_id=None, after=None):
+    """Full-text search over headline titles and descriptions, best match first.
+
+    Uses the FULLTEXT index on news_headlines(title, description). Pages are
+    located with a keyset seek on (score, headline_id) via the `after` token.
+    """
+    match = "MATCH(h.title, h.description) AGAINST (%s IN NATURAL LANGUAGE MODE)"
+    where = [match]
+    params = [q]
+    if category_id:
+        where.append("h.category_id = %s")
+        params.append(category_id)
+    if source_id:
+        where.append("h.source_id = %s")
+        params.append(source_id)
+    
+    having = ""
+    position = decode_search_cursor(after)
+    if position:
+        having = "HAVING score < %s OR (score = %s AND headline_id < %s)"
+        params.extend([position[0], position[0], position[1]])
+    
+    query = f"""
+        SELECT h.*, s.source_name, c.category_name, c.category_icon, {match} AS score
+        FROM news_headlines h
+        JOIN news_sources s ON h.source_id = s.source_id
+        JOIN categories c ON h.category_id = c.category_id
+        WHERE {" AND ".join(where)}
+        {having}
+        ORDER BY score DESC, h.headline_id DESC
+        LIMIT %s
+    """
+    # Fetch one extra row to learn whether another page exists
+    cursor.execute(query, (q, *params, HEADLINES_PER_PAGE + 1))
+    results = cursor.fetchall()
+    has_next = len(results) > HEADLINES_PER_PAGE
+    results = results[:HEADLINES_PER_PAGE]
+    attach_story_sources(cursor, results)
+    
+    return {
+        'headlines': results,
+        'next_cursor': encode_search_cursor(results[-1]) if has_next else None,
+    }
+
+def encode_search_cursor(result):
+    raw = f"{float(result['score'])!r}|{result['headline_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_search_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        score_part, id_part = raw.split('|')
+        return float(score_part), int(id_part)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+@app.route('/search')
+def search():
+    try:
+        log_visit("Search")
+    except Exception:
+        pass
+    q = request.args.get('q', '').strip()
+    category_filter = request.args.get('category', None)
+    source_id = request.args.get('source', None, type=int)
+    after = request.args.get('after', None)
+    
+    cursor = get_read_db().cursor(dictionary=True)
+    categories = get_categories(cursor)
+    sources = get_sources(cursor)
+    
+    category_id = None
+    if category_filter:
+        category_id = next((c['category_id'] for c in categories
+                            if c['category_name'] == category_filter), None)
+    
+    result = {'headlines': [], 'next_cursor': None}
+    if q and not (category_filter and category_id is None):
+        result = search_headlines(cursor, q, category_id, source_id, after)
+    
+    favorite_ids = set()
+    if 'user_id' in session:
+        favorite_ids = get_favorite_ids(cursor, session['user_id'],
+                                        [h['headline_id'] for h in result['headlines']])
+    cursor.close()
+    
+    return render_template('search.html',
+                         q=q,
+                         headlines=result['headlines'],
+                         next_cursor=result['next_cursor'],
+                         categories=categories,
+                         sources=sources,
+                         current_category=category_filter,
+                         current_source=source_id,
+                         favorite_ids=favorite_ids)
 
 # ==================== REGISTER ====================
 @app.route('/register', methods=['GET', 'POST'])
@@ -103,13 +574,13 @@ def register():
                 (username, email, hashed_pw)
             )
             conn.commit()
+            mark_write()
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
         except mysql.connector.IntegrityError:
             flash('Username or email already exists!', 'error')
         finally:
             cursor.close()
-            conn.close()
     
     return render_template('register.html')
 
@@ -130,7 +601,6 @@ def login():
         cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
         user = cursor.fetchone()
         cursor.close()
-        conn.close()
         
         if user and user['password'] == password:
             session['user_id'] = user['user_id']
@@ -166,12 +636,12 @@ def add_favorite(headline_id):
             (user_id, headline_id)
         )
         conn.commit()
+        mark_write()
         flash('Added to favorites!', 'success')
     except mysql.connector.IntegrityError:
         flash('Already in favorites!', 'info')
     finally:
         cursor.close()
-        conn.close()
     
     return redirect(request.referrer or url_for('index'))
 
@@ -191,34 +661,14 @@ def remove_favorite(headline_id):
     )
     conn.commit()
     cursor.close()
-    conn.close()
+    mark_write()
     
     flash('Removed from favorites!', 'info')
     return redirect(request.referrer or url_for('favorites'))
 
 # ==================== MY FAVORITES ====================
-@app.route('/favorites')
-def favorites():
-    # Log visit
-    try:
-        log_visit("Favorites")
-    except Exception:
-        pass
-    if 'user_id' not in session:
-        flash('Please login to view favorites!', 'error')
-        return redirect(url_for('login'))
-    
-    user_id = session['user_id']
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-    
-    # Get category filter
-    category_filter = request.args.get('category', None)
-    
-    # Get all categories for filter buttons
-    cursor.execute("SELECT * FROM categories ORDER BY category_name")
-    categories = cursor.fetchall()
-    
+def favorites_query(user_id, category_filter=None):
+    """Query for a user's saved headlines, most recently saved first."""
     # Build query based on category filter
     if category_filter:
         query = """
@@ -230,7 +680,7 @@ def favorites():
             WHERE f.user_id = %s AND c.category_name = %s
             ORDER BY f.saved_at DESC
         """
-        cursor.execute(query, (user_id, category_filter))
+        return query, (user_id, category_filter)
     else:
         query = """
             SELECT h.*, s.source_name, c.category_name, c.category_icon, f.saved_at
@@ -241,12 +691,37 @@ def favorites():
             WHERE f.user_id = %s
             ORDER BY f.saved_at DESC
         """
-        cursor.execute(query, (user_id,))
+        return query, (user_id,)
+
+def fetch_favorites(cursor, user_id, category_filter=None):
+    """Return a user's saved headlines, most recently saved first."""
+    cursor.execute(*favorites_query(user_id, category_filter))
+    return cursor.fetchall()
+
+@app.route('/favorites')
+def favorites():
+    # Log visit
+    try:
+        log_visit("Favorites")
+    except Exception:
+        pass
+    if 'user_id' not in session:
+        flash('Please login to view favorites!', 'error')
+        return redirect(url_for('login'))
+    
+    user_id = session['user_id']
+    conn = get_read_db()
+    cursor = conn.cursor(dictionary=True)
+    
+    # Get category filter
+    category_filter = request.args.get('category', None)
     
-    headlines = cursor.fetchall()
+    # Get all categories for filter buttons
+    categories = get_categories(cursor)
+    
+    headlines = fetch_favorites(cursor, user_id, category_filter)
     
     cursor.close()
-    conn.close()
     
     return render_template('favorites.html', 
                          headlines=headlines,
@@ -254,6 +729,13 @@ def favorites():
                          current_category=category_filter)
 
 # ==================== CATEGORY STATS ====================
+CATEGORY_STATS_QUERY = """
+    SELECT c.category_name, c.category_icon, COALESCE(cc.headline_count, 0) as count
+    FROM categories c
+    LEFT JOIN category_counts cc ON c.category_id = cc.category_id
+    ORDER BY count DESC
+"""
+
 @app.route('/categories')
 def category_stats():
     # Log visit
@@ -261,21 +743,15 @@ def category_stats():
         log_visit("Category Stats")
     except Exception:
         pass
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor(dictionary=True)
     
-    query = """
-        SELECT c.category_name, c.category_icon, COUNT(h.headline_id) as count
-        FROM categories c
-        LEFT JOIN news_headlines h ON c.category_id = h.category_id
-        GROUP BY c.category_id
-        ORDER BY count DESC
-    """
-    cursor.execute(query)
-    stats = cursor.fetchall()
+    def load():
+        cursor.execute(CATEGORY_STATS_QUERY)
+        return cursor.fetchall()
+    stats = get_or_set("headlines:category_stats", load)
     
     cursor.close()
-    conn.close()
     
     return render_template('categories.html', stats=stats)
 
@@ -291,22 +767,56 @@ def scrape():
         flash('Please login first!', 'error')
         return redirect(url_for('login'))
     
-    # Run scraper
+    # Queue a scrape for the background scheduler
     try:
-        scrape_all_sources()
-        flash('News scraped successfully!', 'success')
+        scheduler.enqueue(get_db(), session['user_id'])
+        flash('Scrape queued! New headlines will appear shortly.', 'success')
     except Exception as e:
-        flash(f'Error scraping news: {str(e)}', 'error')
+        flash(f'Error queueing scrape: {str(e)}', 'error')
     
     return redirect(url_for('index'))
 
+@app.route('/scrape/status')
+def scrape_status():
+    cursor = get_db().cursor(dictionary=True)
+    status = get_scrape_status(cursor)
+    cursor.close()
+    return jsonify(status)
+
 # ==================== CHECK IF FAVORITED ====================
+def get_favorite_ids(cursor, user_id, headline_ids):
+    """Return the subset of headline_ids the user has favorited.
+
+    The result is also kept on `g` so the is_favorited filter can answer
+    from memory for the rest of the request.
+    """
+    favorite_ids = set()
+    if headline_ids:
+        cursor.execute(*favorite_ids_query(user_id, headline_ids))
+        favorite_ids = {row['headline_id'] if isinstance(row, dict) else row[0]
+                        for row in cursor.fetchall()}
+    remember_favorite_ids(favorite_ids, headline_ids)
+    return favorite_ids
+
+def favorite_ids_query(user_id, headline_ids):
+    placeholders = ', '.join(['%s'] * len(headline_ids))
+    return (f"SELECT headline_id FROM favorites WHERE user_id = %s AND headline_id IN ({placeholders})",
+            (user_id, *headline_ids))
+
+def remember_favorite_ids(favorite_ids, headline_ids):
+    g.favorite_ids = favorite_ids
+    g.favorite_ids_checked = set(headline_ids)
+
 @app.template_filter('is_favorited')
 def is_favorited(headline_id):
     if 'user_id' not in session:
         return False
     
-    conn = get_db()
+    # Answer from the batch loaded earlier in this request if possible
+    if headline_id in g.get('favorite_ids_checked', ()):
+        return headline_id in g.favorite_ids
+    
+    conn = get_read_db()
     cursor = conn.cursor()
     cursor.execute(
         "SELECT 1 FROM favorites WHERE user_id = %s AND headline_id = %s",
@@ -314,7 +824,6 @@ def is_favorited(headline_id):
     )
     result = cursor.fetchone()
     cursor.close()
-    conn.close()
     
     return result is not None
 
@@ -367,79 +876,131 @@ def timesince(dt):
 
 # ==================== VISITOR LOGGING ====================
 def log_visit(page_name):
-    """Record a visitor action into the visit_logs table."""
+    """Queue a visitor action for the background visit_logs writer."""
     try:
         ip = request.remote_addr
     except Exception:
         ip = None
     user_id = session.get('user_id')
 
-    conn = get_db()
-    cursor = conn.cursor()
+    visit_logger.log(user_id, ip, page_name)
+
+
+# ==================== REPORT DOWNLOADS ====================
+VISITOR_COLUMNS = ['ID', 'User ID', 'IP Address', 'Page', 'Visited At']
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def visitor_report_query(limit=None):
+    """Build the visit_logs export query, honouring ?start= and ?end= (YYYY-MM-DD)."""
+    start = request.args.get('start', type=parse_date)
+    end = request.args.get('end', type=parse_date)
+    
+    where = []
+    params = []
+    if start:
+        where.append("visited_at >= %s")
+        params.append(start)
+    if end:
+        # End date is inclusive
+        where.append("visited_at < %s")
+        params.append(end + timedelta(days=1))
+    
+    query = "SELECT id, user_id, ip_address, visited_page, visited_at FROM visit_logs"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY visited_at DESC"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    return query, params
+
+def iter_visitor_rows(query, params):
+    """Yield visit_logs rows in chunks from an unbuffered (server-side) cursor.
+
+    Uses its own pooled connection (a replica when one is healthy) so the
+    rows can be streamed after the view function has returned.
+    """
+    pool, conn = get_router().acquire_read()
+    cursor = conn.cursor(buffered=False)
     try:
-        cursor.execute(
-            "INSERT INTO visit_logs (user_id, ip_address, visited_page) VALUES (%s, %s, %s)",
-            (user_id, ip, page_name)
-        )
-        conn.commit()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            yield from rows
     finally:
-        cursor.close()
-        conn.close()
+        if conn.unread_result:
+            # Client disconnected mid-export: draining the rest of the result
+            # could take as long as the export, so drop the connection and
+            # let the pool open a new one
+            pool.discard(conn)
+        else:
+            cursor.close()
+            pool.release(conn)
 
+def visitor_report_rows():
+    """Rows for the visitor exports: live visit_logs, then archived months if ?start= reaches them."""
+    query, params = visitor_report_query()
+    # Archived months are all older than the live partitions, so newest-first order holds
+    return itertools.chain(iter_visitor_rows(query, params), archived_visitor_rows())
+
+def archived_visitor_rows():
+    """Archived visits in the ?start=/?end= range; none without a start date."""
+    start = request.args.get('start', type=parse_date)
+    if not start:
+        return iter(())
+    end = request.args.get('end', type=parse_date)
+    return iter_archived_visits(start, end + timedelta(days=1) if end else None)
 
-# ==================== REPORT DOWNLOADS ====================
 @app.route('/download/visitors/csv')
 def download_visitors_csv():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, user_id, ip_address, visited_page, visited_at FROM visit_logs ORDER BY visited_at DESC")
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    rows = visitor_report_rows()
 
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['ID', 'User ID', 'IP Address', 'Page', 'Visited At'])
-    for r in rows:
-        cw.writerow(r)
+    def generate():
+        si = io.StringIO()
+        cw = csv.writer(si)
+        cw.writerow(VISITOR_COLUMNS)
+        for i, r in enumerate(rows, 1):
+            cw.writerow(r)
+            if i % EXPORT_CHUNK_SIZE == 0:
+                yield si.getvalue()
+                si.seek(0)
+                si.truncate(0)
+        yield si.getvalue()
 
-    output = si.getvalue()
-    return Response(output, mimetype='text/csv', headers={
+    return Response(generate(), mimetype='text/csv', headers={
         'Content-Disposition': 'attachment; filename=visitors_report.csv'
     })
 
 
 @app.route('/download/visitors/excel')
 def download_visitors_excel():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, user_id, ip_address, visited_page, visited_at FROM visit_logs ORDER BY visited_at DESC")
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    rows = visitor_report_rows()
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = 'Visitors'
-    ws.append(['ID', 'User ID', 'IP Address', 'Page', 'Visited At'])
+    # Write-only mode streams rows to a temp file instead of holding the sheet in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Visitors')
+    ws.append(VISITOR_COLUMNS)
     for r in rows:
         # If visited_at is datetime-like, keep as string
         ws.append([r[0], r[1], r[2], r[3], str(r[4])])
 
-    bio = io.BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-    return send_file(bio, as_attachment=True, download_name='visitors_report.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    tmp = tempfile.TemporaryFile()
+    wb.save(tmp)
+    tmp.seek(0)
+    return send_file(tmp, as_attachment=True, download_name='visitors_report.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
 
 @app.route('/download/visitors/pdf')
 def download_visitors_pdf():
-    conn = get_db()
+    query, params = visitor_report_query(limit=50)
+    conn = get_read_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT id, user_id, ip_address, visited_page, visited_at FROM visit_logs ORDER BY visited_at DESC LIMIT 50")
+    cursor.execute(query, params)
     rows = cursor.fetchall()
     cursor.close()
-    conn.close()
 
     buffer = io.BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
@@ -474,5 +1035,164 @@ def reports():
         pass
     return render_template('reports.html')
 
+@app.route('/reports/visits')
+def visit_trends():
+    try:
+        log_visit('Visit Trends')
+    except Exception:
+        pass
+    days = request.args.get('days', 30, type=int)
+    cursor = get_read_db().cursor(dictionary=True)
+    trends = get_visit_trends(cursor, days)
+    cursor.close()
+    return render_template('visit_trends.html', days=days, **trends)
+
+# ==================== IMAGE PROXY ====================
+@app.template_filter('thumbnail_url')
+def thumbnail_url(image_url):
+    """Local thumbnail URL for a headline image (the original if the proxy is off)."""
+    if not image_url or not IMAGE_PROXY_ENABLED:
+        return image_url
+    return url_for('thumbnail', signature=sign_url(image_url), u=image_url)
+
+@app.route('/img/<signature>')
+def thumbnail(signature):
+    image_url = request.args.get('u', '')
+    if not image_url or not verify_url(image_url, signature):
+        abort(404)
+    path = get_thumbnail(image_url)
+    if path is None:
+        # Couldn't fetch or decode it; let the browser try the original for now
+        response = redirect(image_url)
+        response.headers['Cache-Control'] = 'public, max-age=600'
+        return response
+    # A given signed URL always maps to the same thumbnail
+    response = send_file(path, mimetype='image/webp', conditional=True,
+                         etag=os.path.basename(path)[:-len('.webp')], max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+# ==================== JSON API (v1) ====================
+API_HEADLINE_FIELDS = ('headline_id', 'title', 'description', 'url', 'image_url', 'source_name',
+                       'category_name', 'publish_date', 'saved_at', 'also_on')
+
+def api_fields():
+    """Fields requested with ?fields=a,b,c (default: all public fields)."""
+    requested = request.args.get('fields')
+    if not requested:
+        return API_HEADLINE_FIELDS
+    return tuple(f for f in API_HEADLINE_FIELDS if f in requested.split(','))
+
+def api_headline(h, fields):
+    item = {}
+    for field in fields:
+        if field not in h:
+            continue
+        value = h[field]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif field == 'also_on':
+            value = [{'source_name': o['source_name'], 'url': o['url']} for o in value]
+        item[field] = value
+    return item
+
+def api_response(payload, private=False):
+    """Compact JSON with a strong ETag; answers 304 when the client's copy is current."""
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str)
+    response = Response(body, mimetype='application/json')
+    response.add_etag()
+    if private:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={API_MAX_AGE}'
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+@app.route('/api/v1/headlines')
+def api_headlines():
+    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after', None)
+    before = request.args.get('before', None)
+    category_filter = request.args.get('category', None)
+    fields = api_fields()
+    
+    cursor = get_read_db().cursor(dictionary=True)
+    categories = get_categories(cursor)
+    category_id = None
+    if category_filter:
+        category_id = next((c['category_id'] for c in categories
+                            if c['category_name'] == category_filter), None)
+        if category_id is None:
+            cursor.close()
+            return jsonify({'error': f'Unknown category: {category_filter}'}), 404
+    
+    total = get_headline_count(cursor, category_id)
+    result = get_or_set(
+        f"headlines:page:{category_id}:{page}:{after}:{before}",
+        lambda: fetch_headlines(cursor, category_id, page, after, before)
+    )
+    cursor.close()
+    
+    return api_response({
+        'headlines': [api_headline(h, fields) for h in result['headlines']],
+        'next': result['next_cursor'],
+        'prev': result['prev_cursor'],
+        'total': total,
+    })
+
+@app.route('/api/v1/categories')
+def api_categories():
+    cursor = get_read_db().cursor(dictionary=True)
+    categories = get_categories(cursor)
+    cursor.close()
+    return api_response({
+        'categories': [{'category_id': c['category_id'],
+                        'category_name': c['category_name'],
+                        'category_icon': c['category_icon']} for c in categories]
+    })
+
+@app.route('/api/v1/favorites')
+def api_favorites():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Login required'}), 401
+    fields = api_fields()
+    cursor = get_read_db().cursor(dictionary=True)
+    headlines = fetch_favorites(cursor, session['user_id'], request.args.get('category', None))
+    cursor.close()
+    return api_response({'headlines': [api_headline(h, fields) for h in headlines]}, private=True)
+
+# ==================== DATABASE POOL STATS ====================
+@app.route('/stats/db')
+def db_stats():
+    return jsonify(get_pool().stats())
+
+@app.route('/stats/visits')
+def visit_log_stats():
+    return jsonify(visit_logger.stats())
+
+@app.route('/stats/replicas')
+def replica_stats():
+    return jsonify(get_router().stats())
+
+@app.route('/stats/cache')
+def cache_stats():
+    return jsonify(cache.stats())
+
+@app.route('/stats/images')
+def image_cache_stats():
+    return jsonify(thumbnails.stats())
+
+@app.route('/stats/live')
+def live_stats():
+    return jsonify(hub.stats())
+
+@app.route('/stats/slow-queries')
+def slow_query_stats():
+    return jsonify(metrics.slow_queries())
+
+@app.route('/metrics')
+def request_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=DEBUG)
\ No newline at end of file
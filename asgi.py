@@ -0,0 +1,483 @@
+"""ASGI entry point: the read-heavy routes on an async MySQL pool, everything else via Flask.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 asgi:app
+
+index, favorites, category stats, the JSON API and the CSV export run as
+coroutines on aiomysql, so a worker keeps accepting requests while their
+queries are in flight and independent queries run concurrently. They use
+the same SQL, cache keys and templates as app.py, and their reads follow
+the same replica routing as app.get_read_db(). The live headline stream
+waits on the event loop, so open streams don't hold threads. Every other
+route (login, favorite writes, Excel/PDF reports, images) is the
+unchanged Flask app, run on a thread pool.
+"""
+import asyncio
+import csv
+import io
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from flask import render_template, redirect, url_for, flash, jsonify
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as web
+from cache import cache
+from config import (DB_CONFIG, COUNT_CACHE_TTL, EXPORT_CHUNK_SIZE, SCHEDULER_ENABLED,
+                    ASYNC_DB_POOL_SIZE, ASYNC_WSGI_THREADS, READ_YOUR_WRITES_SECONDS,
+                    LIVE_ASYNC_MAX_CONNECTIONS, LIVE_HEARTBEAT_INTERVAL, LIVE_MAX_STREAM_SECONDS)
+from db import get_router
+from live import hub, format_event
+from scheduler import scheduler
+
+
+# Errors that mean the server or connection failed, not the query
+FAILOVER_ERRORS = (OSError, aiomysql.OperationalError, aiomysql.InterfaceError)
+
+
+class AsyncDatabase:
+    """aiomysql pool for one worker process; each query checks a connection out and back.
+
+    A replica's pool has the primary's as `fallback`: when the replica
+    cannot hand out a connection or a query on it fails with a connection
+    error, the replica is marked down in the shared ReplicaRouter and the
+    query runs again on the primary.
+    """
+
+    def __init__(self, config, size=20, replica=None, fallback=None):
+        self.config = config
+        self.size = size
+        self.replica = replica
+        self.fallback = fallback
+        self.pool = None
+
+    async def open(self):
+        self.pool = await aiomysql.create_pool(
+            host=self.config['host'], port=self.config.get('port', 3306),
+            user=self.config['user'], password=self.config['password'], db=self.config['database'],
+            # Replicas connect lazily so one that is down doesn't stop startup
+            minsize=0 if self.replica else 1, maxsize=self.size,
+            autocommit=True, charset='utf8mb4', pool_recycle=3600,
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.pool.acquire()
+        try:
+            yield conn
+        finally:
+            self.pool.release(conn)
+
+    def _mark_down(self, error):
+        """Take this replica out of rotation; False for the primary (nothing to fall back to)."""
+        if self.fallback is None:
+            return False
+        get_router().mark_down(self.replica, error)
+        return True
+
+    async def fetchall(self, query, params=()):
+        try:
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute(query, params)
+                    return list(await cursor.fetchall())
+        except FAILOVER_ERRORS as e:
+            if not self._mark_down(e):
+                raise
+        return await self.fallback.fetchall(query, params)
+
+    async def fetchone(self, query, params=()):
+        rows = await self.fetchall(query, params)
+        return rows[0] if rows else None
+
+    async def stream(self, query, params=(), size=1000):
+        """Yield rows from an unbuffered (server-side) cursor, `size` at a time.
+
+        Fails over to the primary only before the first row: after that the
+        caller has already sent part of the result.
+        """
+        started = False
+        try:
+            async with self.connection() as conn:
+                async with conn.cursor(aiomysql.SSCursor) as cursor:
+                    await cursor.execute(query, params)
+                    while True:
+                        rows = await cursor.fetchmany(size)
+                        if not rows:
+                            break
+                        started = True
+                        for row in rows:
+                            yield row
+                    return
+        except FAILOVER_ERRORS as e:
+            if not self._mark_down(e) or started:
+                raise
+        async for row in self.fallback.stream(query, params, size):
+            yield row
+
+
+db = AsyncDatabase(DB_CONFIG, ASYNC_DB_POOL_SIZE)
+replica_dbs = {replica.name: AsyncDatabase(replica.config, ASYNC_DB_POOL_SIZE, replica, fallback=db)
+               for replica in get_router().replicas}
+
+
+def reader(session):
+    """Database for read-only queries, chosen like app.get_read_db().
+
+    Sessions that wrote recently read the primary; otherwise a healthy
+    replica is used when there is one.
+    """
+    if time.time() - session.get('wrote_at', 0) < READ_YOUR_WRITES_SECONDS:
+        return db
+    replica = get_router().choose()
+    return replica_dbs[replica.name] if replica is not None else db
+
+_MISSING = object()
+
+
+async def get_or_set(key, load, ttl=None):
+    """Async counterpart of cache.get_or_set; shares entries with the Flask routes."""
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = await load()
+        cache.set(key, value, ttl)
+    return value
+
+
+# ==================== FLASK BRIDGE ====================
+def flask_request_for(request):
+    """Werkzeug request (args, cookies) and Flask session for an ASGI request."""
+    req = web.app.request_class(build_environ(request.scope, io.BytesIO()))
+    session = web.app.session_interface.open_session(web.app, req)
+    return req, session if session is not None else {}
+
+
+async def flask_response(req, view):
+    """Run the synchronous end of a view (templates, flash, session) in a Flask request context.
+
+    The response goes through Flask's after_request hooks (session cookie,
+    compression, ETags) before being handed back to Starlette. Rendering and
+    compressing are CPU work, so all of it runs on a worker thread rather
+    than the event loop.
+    """
+    return await run_in_threadpool(_flask_response, req, view)
+
+
+def _flask_response(req, view):
+    with web.app.request_context(req.environ):
+        response = web.app.process_response(web.app.make_response(view()))
+        # As Response.__call__ would: no body for HEAD or 304, no entity headers on a 304
+        headers = response.get_wsgi_headers(req.environ)
+        body = b''.join(response.get_app_iter(req.environ))
+        out = Response(body, status_code=response.status_code)
+        out.raw_headers = [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                           for k, v in headers.items()]
+    return out
+
+
+def log_visit(page_name):
+    try:
+        web.log_visit(page_name)
+    except Exception:
+        pass
+
+
+# ==================== QUERIES ====================
+async def get_categories(source):
+    return await get_or_set("categories", lambda: source.fetchall(web.CATEGORIES_QUERY))
+
+
+async def get_headline_count(source, category_id=None):
+    async def count():
+        row = await source.fetchone(*web.headline_count_query(category_id))
+        return int(row['total']) if row else 0
+    return await get_or_set(f"headlines:count:{category_id}", count, ttl=COUNT_CACHE_TTL)
+
+
+async def fetch_headlines(source, category_id=None, page=1, after=None, before=None):
+    query, params, after_pos, before_pos = web.headlines_query(category_id, page, after, before)
+    result = web.headlines_page(await source.fetchall(query, params), page, after_pos, before_pos)
+    headlines = result['headlines']
+    rows = []
+    if headlines:
+        rows = await source.fetchall(*web.story_sources_query([h['headline_id'] for h in headlines]))
+    web.set_story_sources(headlines, rows)
+    return result
+
+
+async def get_favorite_ids(source, user_id, headline_ids):
+    if not headline_ids:
+        return set()
+    rows = await source.fetchall(*web.favorite_ids_query(user_id, headline_ids))
+    return {row['headline_id'] for row in rows}
+
+
+async def get_headlines_page(source, categories, category_filter, page, after, before):
+    """(category_id, total, page result) for the index page and the headlines API.
+
+    category_id is None with an empty page when `category_filter` is unknown.
+    """
+    category_id = None
+    if category_filter:
+        category_id = next((c['category_id'] for c in categories
+                            if c['category_name'] == category_filter), None)
+        if category_id is None:
+            return None, 0, {'headlines': [], 'next_cursor': None, 'prev_cursor': None}
+    total, result = await asyncio.gather(
+        get_headline_count(source, category_id),
+        get_or_set(f"headlines:page:{category_id}:{page}:{after}:{before}",
+                   lambda: fetch_headlines(source, category_id, page, after, before)),
+    )
+    return category_id, total, result
+
+
+# ==================== PAGES ====================
+async def index(request):
+    req, session = flask_request_for(request)
+    page = req.args.get('page', 1, type=int)
+    after = req.args.get('after', None)
+    before = req.args.get('before', None)
+    category_filter = req.args.get('category', None)
+    source = reader(session)
+
+    categories = await get_categories(source)
+    _, total, result = await get_headlines_page(source, categories, category_filter, page, after, before)
+    headlines = result['headlines']
+    total_pages = (total + web.HEADLINES_PER_PAGE - 1) // web.HEADLINES_PER_PAGE
+    headline_ids = [h['headline_id'] for h in headlines]
+    favorite_ids = set()
+    if 'user_id' in session:
+        favorite_ids = await get_favorite_ids(source, session['user_id'], headline_ids)
+
+    def view():
+        log_visit("Homepage")
+        web.remember_favorite_ids(favorite_ids, headline_ids)
+        return render_template('index.html',
+                               headlines=headlines,
+                               categories=categories,
+                               current_category=category_filter,
+                               page=page,
+                               total_pages=total_pages,
+                               next_cursor=result['next_cursor'],
+                               prev_cursor=result['prev_cursor'],
+                               favorite_ids=favorite_ids,
+                               live_stream=web.live_stream_available(),
+                               live_last_id=max(headline_ids, default=0))
+    return await flask_response(req, view)
+
+
+async def favorites(request):
+    req, session = flask_request_for(request)
+    if 'user_id' not in session:
+        def login_required():
+            log_visit("Favorites")
+            flash('Please login to view favorites!', 'error')
+            return redirect(url_for('login'))
+        return await flask_response(req, login_required)
+
+    category_filter = req.args.get('category', None)
+    source = reader(session)
+    categories, headlines = await asyncio.gather(
+        get_categories(source),
+        source.fetchall(*web.favorites_query(session['user_id'], category_filter)),
+    )
+
+    def view():
+        log_visit("Favorites")
+        return render_template('favorites.html',
+                               headlines=headlines,
+                               categories=categories,
+                               current_category=category_filter)
+    return await flask_response(req, view)
+
+
+async def category_stats(request):
+    req, session = flask_request_for(request)
+    stats = await get_or_set("headlines:category_stats",
+                             lambda: reader(session).fetchall(web.CATEGORY_STATS_QUERY))
+
+    def view():
+        log_visit("Category Stats")
+        return render_template('categories.html', stats=stats)
+    return await flask_response(req, view)
+
+
+# ==================== JSON API (v1) ====================
+async def api_headlines(request):
+    req, session = flask_request_for(request)
+    page = req.args.get('page', 1, type=int)
+    after = req.args.get('after', None)
+    before = req.args.get('before', None)
+    category_filter = req.args.get('category', None)
+
+    source = reader(session)
+    categories = await get_categories(source)
+    category_id, total, result = await get_headlines_page(source, categories, category_filter, page, after, before)
+    if category_filter and category_id is None:
+        return await flask_response(req, lambda: (jsonify({'error': f'Unknown category: {category_filter}'}), 404))
+
+    def view():
+        fields = web.api_fields()
+        return web.api_response({
+            'headlines': [web.api_headline(h, fields) for h in result['headlines']],
+            'next': result['next_cursor'],
+            'prev': result['prev_cursor'],
+            'total': total,
+        })
+    return await flask_response(req, view)
+
+
+async def api_categories(request):
+    req, session = flask_request_for(request)
+    categories = await get_categories(reader(session))
+    return await flask_response(req, lambda: web.api_response({
+        'categories': [{'category_id': c['category_id'],
+                        'category_name': c['category_name'],
+                        'category_icon': c['category_icon']} for c in categories]
+    }))
+
+
+async def api_favorites(request):
+    req, session = flask_request_for(request)
+    if 'user_id' not in session:
+        return await flask_response(req, lambda: (jsonify({'error': 'Login required'}), 401))
+    headlines = await reader(session).fetchall(
+        *web.favorites_query(session['user_id'], req.args.get('category', None)))
+
+    def view():
+        fields = web.api_fields()
+        return web.api_response({'headlines': [web.api_headline(h, fields) for h in headlines]}, private=True)
+    return await flask_response(req, view)
+
+
+# ==================== LIVE HEADLINES ====================
+async def headline_stream(request):
+    """app.headline_stream on the event loop: each open stream is a coroutine, not a thread."""
+    req, session = flask_request_for(request)
+    category_filter = req.args.get('category', None)
+    last_id = req.headers.get('Last-Event-ID', req.args.get('last_id'))
+    last_id = int(last_id) if last_id and last_id.isdigit() else None
+
+    category_id = None
+    if category_filter:
+        categories = await get_categories(reader(session))
+        category_id = next((c['category_id'] for c in categories
+                            if c['category_name'] == category_filter), None)
+        if category_id is None:
+            return Response('Unknown category', status_code=404, media_type='text/plain')
+
+    subscribed = hub.subscribe(category_id, last_id, loop=asyncio.get_running_loop())
+    if subscribed is None:
+        return Response('Too many live connections', status_code=503, headers={'Retry-After': '30'},
+                        media_type='text/plain')
+    sub, replay = subscribed
+
+    def frame(event):
+        # Thumbnail URLs come from Flask's url_for
+        with web.app.request_context(req.environ):
+            return format_event(web.live_card(event))
+
+    async def generate():
+        try:
+            yield f"retry: {LIVE_HEARTBEAT_INTERVAL * 1000}\n\n"
+            for event in replay:
+                yield frame(event)
+            deadline = time.monotonic() + LIVE_MAX_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break  # fell behind; the client resumes from the replay buffer
+                yield frame(event)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(generate(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+# ==================== REPORT DOWNLOADS ====================
+async def download_visitors_csv(request):
+    req, session = flask_request_for(request)
+    source = reader(session)
+    with web.app.request_context(req.environ):
+        query, params = web.visitor_report_query()
+        archived = web.archived_visitor_rows()
+
+    async def generate():
+        si = io.StringIO()
+        cw = csv.writer(si)
+        cw.writerow(web.VISITOR_COLUMNS)
+        count = 0
+
+        def flush():
+            data = si.getvalue()
+            si.seek(0)
+            si.truncate(0)
+            return data
+
+        async for r in source.stream(query, params, EXPORT_CHUNK_SIZE):
+            cw.writerow(r)
+            count += 1
+            if count % EXPORT_CHUNK_SIZE == 0:
+                yield flush()
+        # Archive files are read (and gunzipped) off the event loop
+        async for r in iterate_in_threadpool(archived):
+            cw.writerow(r)
+            count += 1
+            if count % EXPORT_CHUNK_SIZE == 0:
+                yield flush()
+        yield flush()
+
+    return StreamingResponse(generate(), media_type='text/csv', headers={
+        'Content-Disposition': 'attachment; filename=visitors_report.csv'
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Streams here don't hold threads, so the cap is not bound by the thread pool
+    hub.max_connections = LIVE_ASYNC_MAX_CONNECTIONS
+    await db.open()
+    for replica_db in replica_dbs.values():
+        await replica_db.open()
+    if SCHEDULER_ENABLED:
+        scheduler.ensure_started()
+    try:
+        yield
+    finally:
+        for replica_db in replica_dbs.values():
+            await replica_db.close()
+        await db.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/favorites', favorites),
+        Route('/categories', category_stats),
+        Route('/api/v1/headlines', api_headlines),
+        Route('/api/v1/categories', api_categories),
+        Route('/api/v1/favorites', api_favorites),
+        Route('/stream/headlines', headline_stream),
+        Route('/download/visitors/csv', download_visitors_csv),
+        Mount('/', app=WSGIMiddleware(web.app, workers=ASYNC_WSGI_THREADS)),
+    ],
+    lifespan=lifespan,
+)
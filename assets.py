@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped; gzip is always built
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST = 'manifest.json'
+
+# Files that get fingerprinted and precompressed
+ASSET_EXTENSIONS = ('.css', '.js')
+
+# (Content-Encoding, file suffix), most preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprint(name, data):
+    """style.css -> style.<first 12 hex of sha256>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def write_if_changed(path, data):
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Write fingerprinted copies of the static CSS/JS plus .gz/.br variants.
+
+    Returns the manifest mapping each source name to its fingerprinted name.
+    Old fingerprints are left in place so pages cached by browsers keep
+    working across a deploy.
+    """
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for name in sorted(os.listdir(static_dir)):
+        path = os.path.join(static_dir, name)
+        if not name.endswith(ASSET_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            data = f.read()
+        hashed = fingerprint(name, data)
+        target = os.path.join(dist_dir, hashed)
+        write_if_changed(target, data)
+        # mtime=0 keeps the .gz byte-identical between builds
+        write_if_changed(target + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            write_if_changed(target + '.br', brotli.compress(data, quality=11))
+        manifest[name] = hashed
+    write_if_changed(os.path.join(dist_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def load_manifest(dist_dir=DIST_DIR):
+    try:
+        with open(os.path.join(dist_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def pick_variant(path, accept_encoding):
+    """Return (file path, Content-Encoding or None) for the best precompressed variant."""
+    for encoding, suffix in ENCODINGS:
+        if encoding in accept_encoding and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def pick_encoding(accept_encoding):
+    """Content-Encoding for a dynamic response body, or None to send it as is."""
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def compress_body(data, encoding, level=6):
+    """Compress a dynamic response body with an encoding from pick_encoding()."""
+    if encoding == 'br':
+        # Low brotli quality: still smaller than gzip -6 and fast enough per request
+        return brotli.compress(data, quality=4)
+    return gzip.compress(data, compresslevel=level)
+
+
+if __name__ == "__main__":
+    # Build step for deploys: python assets.py
+    for source, hashed in build_assets().items():
+        print(f"{source} -> dist/{hashed}")
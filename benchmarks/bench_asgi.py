@@ -0,0 +1,113 @@
+"""Sync (gunicorn app:app) vs async (uvicorn asgi:app) serving under high concurrency.
+
+Starts each server against the seeded benchmark database with the same
+number of worker processes, runs the bench_web scenarios for the routes
+asgi.py serves natively, and reports requests/s and p99 for both modes.
+The sync server is started like the Procfile's: the gthread worker with
+WEB_THREADS threads per process.
+
+    python benchmarks/seed.py --reset
+    python benchmarks/bench_asgi.py --workers 2 --concurrency 64 --requests 2000
+
+Each run is saved to benchmarks/results/asgi-<commit>.json. No sync vs
+async comparison has been recorded yet; run this against the benchmark
+database (benchmarks/docker-compose.yml) before choosing asgi.py over the
+Procfile's gunicorn app:app for production.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import bench_web  # noqa: E402
+from report import RESULTS_DIR, ROOT, environment, write_report  # noqa: E402
+from config import WEB_THREADS  # noqa: E402
+
+# bench_web scenario prefixes for the routes asgi.py runs on aiomysql
+ASYNC_SCENARIOS = ['index', 'favorites', 'category_stats', 'export_csv']
+
+
+def server_commands(workers, threads, port):
+    return {
+        'sync': ['gunicorn', '--worker-class', 'gthread', '--workers', str(workers),
+                 '--threads', str(threads), '--bind', f'127.0.0.1:{port}', 'app:app'],
+        'async': ['uvicorn', 'asgi:app', '--workers', str(workers), '--port', str(port),
+                  '--no-access-log', '--log-level', 'warning'],
+    }
+
+
+def start_server(command, port, timeout=30):
+    env = dict(os.environ, DB_NAME=os.environ.get('DB_NAME', 'news_bench'), SCHEDULER_ENABLED='False')
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{command[0]} exited with {proc.returncode}")
+        try:
+            requests.get(f'http://127.0.0.1:{port}/categories', timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{command[0]} did not start within {timeout}s")
+
+
+def run(workers=2, threads=WEB_THREADS, concurrency=64, requests_total=1000, warmup=5, port=8765, only=None):
+    results = {}
+    for mode, command in server_commands(workers, threads, port).items():
+        proc = start_server(command, port)
+        try:
+            results[mode] = bench_web.run(requests_total, concurrency, warmup,
+                                          url=f'http://127.0.0.1:{port}', only=only or ASYNC_SCENARIOS)
+        finally:
+            proc.terminate()
+            proc.wait()
+    return {
+        'environment': environment(),
+        'workers': workers,
+        'sync_threads': threads,
+        'concurrency': concurrency,
+        'modes': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2, help='worker processes for both servers')
+    parser.add_argument('--threads', type=int, default=WEB_THREADS, help='gthread threads per sync worker')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario (exports run a tenth)')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--only', nargs='*', help='scenario name prefixes to run')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--output', help='report path (default: benchmarks/results/asgi-<commit>.json)')
+    args = parser.parse_args()
+
+    results = run(args.workers, args.threads, args.concurrency, args.requests, args.warmup, args.port, args.only)
+    if args.output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        args.output = os.path.join(RESULTS_DIR, f"asgi-{results['environment']['commit']}.json")
+    path = write_report(results, args.output)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    sync, async_ = results['modes']['sync']['scenarios'], results['modes']['async']['scenarios']
+    print(f"{args.workers} workers ({args.threads} gthread threads each for sync), concurrency {args.concurrency}")
+    print(f"{'scenario':20} {'sync req/s':>11} {'async req/s':>12} {'sync p99 ms':>12} {'async p99 ms':>13} {'errors':>7}")
+    for name, s in sync.items():
+        a = async_[name]
+        print(f"{name:20} {s['throughput_per_s']:11.1f} {a['throughput_per_s']:12.1f} "
+              f"{s['p99_ms']:12.2f} {a['p99_ms']:13.2f} {s['errors'] + a['errors']:7}")
+    print(f"Saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark the thumbnail pipeline against a local image fixture server.
+
+Serves generated JPEG/PNG fixtures over HTTP on localhost, then measures
+cold (fetch + resize + encode) and warm (disk hit) thumbnail latency, the
+bytes saved per image, and that the size bound evicts old thumbnails.
+
+    python benchmarks/bench_images.py --images 20
+"""
+import argparse
+import http.server
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# The fixture server is on localhost
+os.environ['IMAGE_ALLOW_PRIVATE_HOSTS'] = 'True'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from images import ThumbnailCache, fetch_image  # noqa: E402
+from report import summarize  # noqa: E402
+
+
+def fixture_image(i, size=(1600, 900)):
+    """A distinct, photo-sized test image (JPEG, or PNG with alpha for every fifth)."""
+    img = Image.new('RGB', size, (i * 37 % 256, i * 91 % 256, i * 53 % 256))
+    draw = ImageDraw.Draw(img)
+    for y in range(0, size[1], 6):
+        draw.line([(0, y), (size[0], (y * 3 + i * 17) % size[1])], fill=(y % 256, (y * i) % 256, 128), width=3)
+    out = io.BytesIO()
+    if i % 5 == 4:
+        img.putalpha(200)
+        img.save(out, 'PNG')
+        return out.getvalue(), 'image/png'
+    img.save(out, 'JPEG', quality=90)
+    return out.getvalue(), 'image/jpeg'
+
+
+def start_fixture_server(count):
+    fixtures = {f"/img/{i}": fixture_image(i) for i in range(count)}
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body, content_type = fixtures.get(self.path, (None, None))
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    return server, {base + path: len(body) for path, (body, _) in fixtures.items()}
+
+
+def timed(cache, urls):
+    latencies = []
+    start = time.perf_counter()
+    for url in urls:
+        t = time.perf_counter()
+        assert cache.get(url, fetch_image), url
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run(images=20):
+    server, originals = start_fixture_server(images)
+    urls = list(originals)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ThumbnailCache(directory, max_bytes=1 << 30)
+            cold = timed(cache, urls)
+            warm = timed(cache, urls)
+            thumb_bytes = sum(os.path.getsize(cache.get(url, fetch_image)) for url in urls)
+
+        with tempfile.TemporaryDirectory() as directory:
+            # Room for about a quarter of the thumbnails
+            bounded = ThumbnailCache(directory, max_bytes=thumb_bytes // 4)
+            for url in urls:
+                bounded.get(url, fetch_image)
+            bounded_stats = bounded.stats()
+    finally:
+        server.shutdown()
+
+    original_bytes = sum(originals.values())
+    return {
+        'images': images,
+        'cold': cold,
+        'warm': warm,
+        'original_kb_per_image': round(original_bytes / images / 1024, 1),
+        'thumbnail_kb_per_image': round(thumb_bytes / images / 1024, 1),
+        'bytes_saved_pct': round(100 * (1 - thumb_bytes / original_bytes), 1),
+        'bounded_cache': {
+            'max_bytes': bounded_stats['max_bytes'],
+            'bytes': bounded_stats['bytes'],
+            'evictions': bounded_stats['evictions'],
+            'within_bound': bounded_stats['bytes'] <= bounded_stats['max_bytes'],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.images)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"cold: p50 {results['cold']['p50_ms']:.1f} ms  p99 {results['cold']['p99_ms']:.1f} ms")
+    print(f"warm: p50 {results['warm']['p50_ms']:.3f} ms  p99 {results['warm']['p99_ms']:.3f} ms")
+    print(f"size: {results['original_kb_per_image']} KB -> {results['thumbnail_kb_per_image']} KB per image "
+          f"({results['bytes_saved_pct']}% smaller)")
+    b = results['bounded_cache']
+    print(f"bounded cache: {b['bytes']} / {b['max_bytes']} bytes after {b['evictions']} evictions")
+
+
+if __name__ == '__main__':
+    main()
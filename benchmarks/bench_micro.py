@@ -0,0 +1,90 @@
+"""Micro-benchmarks for the hot helpers: detect_category, timesince and feed parsing.
+
+Each benchmark is timed in rounds of many calls; per-call latency is
+reported as the mean and p50/p99 across rounds. No database is needed.
+
+    python benchmarks/bench_micro.py --rounds 50
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('SCHEDULER_ENABLED', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from report import percentile  # noqa: E402
+from scraper import detect_category, iter_feed_items, parse_feed  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def load_headlines():
+    with open(os.path.join(FIXTURES, 'labelled_headlines.csv'), newline='', encoding='utf-8') as f:
+        return [(r['title'], r['description']) for r in csv.DictReader(f)]
+
+
+def load_feeds():
+    feeds = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, 'feeds', '*.xml'))):
+        with open(path, 'rb') as f:
+            feeds.append(f.read())
+    return feeds
+
+
+def bench(fn, inputs, rounds):
+    """Time `rounds` passes of fn over inputs; return per-call stats in microseconds."""
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for args in inputs:
+            fn(*args)
+        per_call.append((time.perf_counter() - start) / len(inputs))
+    per_call.sort()
+    return {
+        'calls_per_round': len(inputs),
+        'rounds': rounds,
+        'ops_per_s': round(1 / (sum(per_call) / rounds), 1),
+        'mean_us': round(sum(per_call) / rounds * 1e6, 3),
+        'p50_us': round(percentile(per_call, 50) * 1e6, 3),
+        'p99_us': round(percentile(per_call, 99) * 1e6, 3),
+    }
+
+
+def run(rounds=20):
+    from app import timesince
+
+    headlines = load_headlines()
+    feeds = load_feeds()
+    now = datetime.utcnow()
+    ages = [(now - timedelta(seconds=s),) for s in (5, 90, 4000, 50000, 300000, 2000000, 40000000)]
+    ages += [((now - timedelta(hours=3)).isoformat(),), ('not a date',), (None,)]
+    return {
+        'detect_category': bench(detect_category, headlines, rounds),
+        'timesince': bench(timesince, ages * 10, rounds),
+        'iter_feed_items': bench(lambda body: list(iter_feed_items(body, 10)), [(b,) for b in feeds], rounds),
+        'parse_feed': bench(parse_feed, [(b, 1, {}) for b in feeds], rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.rounds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'benchmark':18} {'ops/s':>12} {'p50 us':>10} {'p99 us':>10}")
+    for name, r in results.items():
+        print(f"{name:18} {r['ops_per_s']:12.1f} {r['p50_us']:10.2f} {r['p99_us']:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmark for RSS parsing over the saved feed fixtures.
+
+Compares the streaming lxml parser in scraper.parse_feed() against the
+original two-pass BeautifulSoup parser, and checks both produce the same
+titles, links, descriptions and images.
+
+    python benchmarks/bench_parse.py --repeat 50
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from scraper import parse_feed  # noqa: E402
+
+FEEDS_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'feeds')
+CATEGORY_IDS = {}
+
+
+def legacy_parse_feed(body, source_id, category_ids):
+    """The original BeautifulSoup parser (full XML tree + one HTML tree per item)."""
+    soup = BeautifulSoup(body, "xml")
+    items = soup.find_all("item")[:10]
+    rows = []
+    for item in items:
+        title = item.title.text if item.title else "No title"
+        desc_tag = item.description
+        desc = desc_tag.text if desc_tag else "No description"
+        desc_soup = BeautifulSoup(desc, "html.parser")
+        desc = desc_soup.get_text()[:500]
+        link = item.link.text if item.link else item.guid.text if item.guid else ""
+        media = item.find("media:content")
+        if media and media.get("url"):
+            img = media["url"]
+        else:
+            img_tag = desc_soup.find("img")
+            img = img_tag["src"] if img_tag and img_tag.get("src") else None
+        pub_date_tag = item.pubDate
+        try:
+            pub_date = datetime.strptime(pub_date_tag.text, "%a, %d %b %Y %H:%M:%S %z")
+        except (AttributeError, ValueError):
+            pub_date = datetime.now()
+        rows.append({"title": title, "description": desc, "url": link,
+                     "image_url": img, "publish_date": pub_date})
+    return rows
+
+
+def load_feeds():
+    feeds = {}
+    for path in sorted(glob.glob(os.path.join(FEEDS_DIR, '*.xml'))):
+        with open(path, 'rb') as f:
+            feeds[os.path.basename(path)] = f.read()
+    return feeds
+
+
+def same_output(a, b):
+    keys = ('title', 'description', 'url', 'image_url', 'publish_date')
+    return [{k: r[k] for k in keys} for r in a] == [{k: r[k] for k in keys} for r in b]
+
+
+def time_parser(fn, feeds, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body in feeds.values():
+            fn(body, 1, CATEGORY_IDS)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(feeds)) * 1000
+
+
+def run(repeat):
+    feeds = load_feeds()
+    mismatched = [name for name, body in feeds.items()
+                  if not same_output(parse_feed(body, 1, CATEGORY_IDS),
+                                     legacy_parse_feed(body, 1, CATEGORY_IDS))]
+    return {
+        'feeds': len(feeds),
+        'mismatched_feeds': mismatched,
+        'legacy_bs4_ms_per_feed': round(time_parser(legacy_parse_feed, feeds, repeat), 3),
+        'streaming_lxml_ms_per_feed': round(time_parser(parse_feed, feeds, repeat), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the fixture feeds')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"feeds: {results['feeds']}  mismatched: {results['mismatched_feeds'] or 'none'}")
+    print(f"legacy BeautifulSoup: {results['legacy_bs4_ms_per_feed']:8.3f} ms/feed")
+    print(f"streaming lxml:       {results['streaming_lxml_ms_per_feed']:8.3f} ms/feed")
+
+
+if __name__ == '__main__':
+    main()
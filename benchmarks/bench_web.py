@@ -0,0 +1,148 @@
+"""Load scenarios for the web routes against a seeded benchmark database.
+
+Runs each scenario through Flask's test client (in process, no network) or,
+with --url, against a running server such as gunicorn. Reports throughput
+and p50/p90/p99 latency per scenario.
+
+    python benchmarks/seed.py --reset
+    python benchmarks/bench_web.py --requests 200 --concurrency 4
+    python benchmarks/bench_web.py --url http://127.0.0.1:8000 --only index
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('DB_NAME', 'news_bench')
+os.environ.setdefault('SCHEDULER_ENABLED', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cache import cache  # noqa: E402
+from report import summarize  # noqa: E402
+
+BENCH_EMAIL = 'bench_user_1@bench.example'
+BENCH_PASSWORD = 'benchmark'
+
+# (name, path, logged_in)
+SCENARIOS = [
+    ('index_anonymous', '/', False),
+    ('index_logged_in', '/', True),
+    ('index_page_2', '/?page=2', False),
+    ('index_deep_page', '/?page=200', False),
+    ('index_category', '/?category=Technology', False),
+    ('index_category_deep', '/?category=Technology&page=50', False),
+    ('favorites', '/favorites', True),
+    ('category_stats', '/categories', False),
+    ('export_csv', '/download/visitors/csv', True),
+    ('export_excel', '/download/visitors/excel', True),
+    ('export_pdf', '/download/visitors/pdf', True),
+]
+
+
+class LocalClient:
+    """Flask test client, logged in through the real /login form when asked."""
+
+    def __init__(self, logged_in):
+        from app import app
+        self.client = app.test_client()
+        if logged_in:
+            self.client.post('/login', data={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+
+    def get(self, path):
+        response = self.client.get(path)
+        response.get_data()  # drain streamed exports
+        return response.status_code
+
+
+class HttpClient:
+    def __init__(self, base_url, logged_in):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        if logged_in:
+            self.session.post(self.base_url + '/login', data={'email': BENCH_EMAIL, 'password': BENCH_PASSWORD})
+
+    def get(self, path):
+        return self.session.get(self.base_url + path).status_code
+
+
+def run_scenario(make_client, path, logged_in, requests_total, concurrency, warmup, cold):
+    clients = [make_client(logged_in) for _ in range(concurrency)]
+    for _ in range(warmup):
+        clients[0].get(path)
+
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    per_worker = [requests_total // concurrency + (1 if i < requests_total % concurrency else 0)
+                  for i in range(concurrency)]
+
+    def worker(client, n):
+        local, failed = [], 0
+        for _ in range(n):
+            if cold:
+                cache.clear()
+            start = time.perf_counter()
+            status = client.get(path)
+            local.append(time.perf_counter() - start)
+            if status >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(c, n)) for c, n in zip(clients, per_worker)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return summarize(latencies, wall, errors[0])
+
+
+def run(requests_total=100, concurrency=1, warmup=5, cold=False, url=None, only=None):
+    if url:
+        def make_client(logged_in):
+            return HttpClient(url, logged_in)
+    else:
+        make_client = LocalClient
+    results = {}
+    for name, path, logged_in in SCENARIOS:
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        # Exports are far heavier than page views; run fewer of them
+        n = max(1, requests_total // 10) if name.startswith('export_') else requests_total
+        results[name] = dict(path=path, logged_in=logged_in,
+                             **run_scenario(make_client, path, logged_in, n, concurrency, warmup, cold))
+    return {
+        'target': url or 'in-process',
+        'concurrency': concurrency,
+        'cold_cache': cold,
+        'scenarios': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='requests per scenario (exports run a tenth)')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--cold', action='store_true', help='clear the in-process cache before every request')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--only', nargs='*', help='scenario name prefixes to run, e.g. index export_csv')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.requests, args.concurrency, args.warmup, args.cold, args.url, args.only)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'scenario':24} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, r in results['scenarios'].items():
+        print(f"{name:24} {r['throughput_per_s']:9.1f} {r['p50_ms']:9.2f} {r['p99_ms']:9.2f} {r['errors']:7}")
+
+
+if __name__ == '__main__':
+    main()
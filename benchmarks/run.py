@@ -0,0 +1,86 @@
+"""Run the benchmark suite and write one JSON report for this commit.
+
+The report (benchmarks/results/<commit>.json by default) records the
+environment plus every suite's results, so two commits can be compared
+with --compare. The web suite needs a seeded database (see seed.py) and
+is skipped with --no-web.
+
+    python benchmarks/run.py --no-web
+    python benchmarks/run.py --requests 200 --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import json
+import os
+import sys
+
+# Set before any app module imports config
+os.environ.setdefault('DB_NAME', 'news_bench')
+os.environ.setdefault('SCHEDULER_ENABLED', 'False')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_classifier  # noqa: E402
+import bench_images  # noqa: E402
+import bench_micro  # noqa: E402
+import bench_parse  # noqa: E402
+from report import environment, write_report  # noqa: E402
+
+# Metrics where a larger number is better; everything else is a latency
+HIGHER_IS_BETTER = ('throughput_per_s', 'ops_per_s', 'per_sec', 'accuracy')
+
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Print metrics that moved by more than 5% between two reports."""
+    old, new = flatten(baseline['results']), flatten(current['results'])
+    print(f"Comparing {baseline['environment']['commit']} -> {current['environment']['commit']}")
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name] or not any(name.endswith(s) for s in HIGHER_IS_BETTER + ('_ms', '_us')):
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        if abs(change) < 5:
+            continue
+        better = (change > 0) == any(name.endswith(s) for s in HIGHER_IS_BETTER)
+        print(f"  {'+' if better else '-'} {name}: {old[name]} -> {new[name]} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=20, help='micro-benchmark rounds')
+    parser.add_argument('--requests', type=int, default=100, help='requests per web scenario')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--no-web', action='store_true', help='skip the database-backed web scenarios')
+    parser.add_argument('--output', help='report path (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier report to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'micro': bench_micro.run(args.rounds),
+        'classifier': bench_classifier.run(args.rounds * 10),
+        'parse': bench_parse.run(args.rounds),
+        'images': bench_images.run(),
+    }
+    if not args.no_web:
+        import bench_web
+        results['web'] = bench_web.run(args.requests, args.concurrency)
+
+    report = {'environment': environment(), 'results': results}
+    path = write_report(report, args.output)
+    print(f"Report written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
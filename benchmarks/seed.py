@@ -0,0 +1,166 @@
+"""Fill a benchmark database with seeded, reproducible data.
+
+Creates the schema from database/schema.sql (with --reset) and inserts N
+headlines, users, favorites and visit logs generated from a fixed seed, so
+two runs with the same arguments produce the same rows. Targets the
+DB_NAME database (default: news_bench), never the app's own unless asked.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    DB_HOST=127.0.0.1 DB_PORT=3307 python benchmarks/seed.py --reset --headlines 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DB_NAME', 'news_bench')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mysql.connector  # noqa: E402
+
+from config import DB_CONFIG  # noqa: E402
+from classifier import CATEGORY_KEYWORDS  # noqa: E402
+from dedup import headline_signature, pack_signature  # noqa: E402
+from rollups import rebuild_category_counts, rollup_visits  # noqa: E402
+
+SCHEMA = os.path.join(os.path.dirname(__file__), '..', 'database', 'schema.sql')
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark'  # every seeded user's password (login compares it as stored)
+
+FILLER = ("report update officials plan new city state national week latest move "
+          "talks record amid early major local deal review ahead rise").split()
+PAGES = ['Homepage', 'Favorites', 'Category Stats', 'Search', 'Login Page', 'Reports Page']
+
+
+def load_schema(conn, database):
+    """Drop and recreate `database` from schema.sql."""
+    with open(SCHEMA, encoding='utf-8') as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    statements = [s.strip() for s in ''.join(lines).split(';') if s.strip()]
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+    cursor.execute(f"CREATE DATABASE `{database}` CHARACTER SET utf8mb4")
+    cursor.execute(f"USE `{database}`")
+    for statement in statements:
+        upper = statement.upper()
+        if upper.startswith('CREATE DATABASE') or upper.startswith('USE '):
+            continue
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+
+
+def insert_batches(conn, query, rows):
+    cursor = conn.cursor()
+    for i in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(query, rows[i:i + BATCH_SIZE])
+        conn.commit()
+    cursor.close()
+
+
+def lookup(conn, query):
+    cursor = conn.cursor()
+    cursor.execute(query)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def headline_rows(rng, count, categories, source_ids, now, days):
+    rows = []
+    for i in range(count):
+        category_name, category_id = rng.choice(categories)
+        keywords = CATEGORY_KEYWORDS.get(category_name) or FILLER
+        words = rng.sample(keywords, min(2, len(keywords))) + rng.sample(FILLER, 4)
+        rng.shuffle(words)
+        title = ' '.join(words).capitalize()
+        description = ' '.join(rng.choice(FILLER) for _ in range(rng.randint(15, 40))).capitalize() + '.'
+        source_id = rng.choice(source_ids)
+        published = now - timedelta(seconds=rng.randint(0, days * 86400))
+        rows.append((
+            title, description, f"https://bench.example/{source_id}/{i}",
+            f"https://bench.example/img/{i}.jpg" if rng.random() < 0.7 else None,
+            source_id, category_id, published,
+            pack_signature(headline_signature(title, description)),
+        ))
+    return rows
+
+
+def seed(conn, args):
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    categories = lookup(conn, "SELECT category_name, category_id FROM categories ORDER BY category_id")
+    source_ids = [row[0] for row in lookup(conn, "SELECT source_id FROM news_sources ORDER BY source_id")]
+    counts = {}
+
+    start = time.perf_counter()
+    insert_batches(conn, """
+        INSERT INTO news_headlines (title, description, url, image_url, source_id, category_id, publish_date, minhash)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, headline_rows(rng, args.headlines, categories, source_ids, now, args.days))
+    headline_ids = [row[0] for row in lookup(conn, "SELECT headline_id FROM news_headlines ORDER BY headline_id")]
+    counts['headlines'] = len(headline_ids)
+
+    users = [(f"bench_user_{i}", f"bench_user_{i}@bench.example", PASSWORD) for i in range(1, args.users + 1)]
+    insert_batches(conn, "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", users)
+    user_ids = [row[0] for row in lookup(conn, "SELECT user_id FROM users ORDER BY user_id")]
+    counts['users'] = len(user_ids)
+
+    favorites = []
+    for user_id in user_ids:
+        # Skewed: a few heavy users, many light ones
+        n = min(len(headline_ids), int(rng.expovariate(1 / args.favorites)) if args.favorites else 0)
+        for headline_id in rng.sample(headline_ids, n):
+            favorites.append((user_id, headline_id, now - timedelta(seconds=rng.randint(0, args.days * 86400))))
+    insert_batches(conn, "INSERT INTO favorites (user_id, headline_id, saved_at) VALUES (%s, %s, %s)", favorites)
+    counts['favorites'] = len(favorites)
+
+    visits = []
+    for _ in range(args.visits):
+        visits.append((
+            rng.choice(user_ids) if user_ids and rng.random() < 0.3 else None,
+            f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            rng.choice(PAGES),
+            now - timedelta(seconds=rng.randint(0, args.days * 86400)),
+        ))
+    insert_batches(conn, """
+        INSERT INTO visit_logs (user_id, ip_address, visited_page, visited_at) VALUES (%s, %s, %s, %s)
+    """, visits)
+    counts['visit_logs'] = len(visits)
+
+    rebuild_category_counts(conn)
+    rollup_visits(conn)
+    counts['seconds'] = round(time.perf_counter() - start, 1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reset', action='store_true', help='drop and recreate the database from schema.sql')
+    parser.add_argument('--seed', type=int, default=1610)
+    parser.add_argument('--headlines', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--favorites', type=int, default=25, help='mean favorites per user')
+    parser.add_argument('--visits', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=60, help='spread timestamps over the last N days')
+    args = parser.parse_args()
+
+    database = DB_CONFIG['database']
+    if args.reset:
+        server = {k: v for k, v in DB_CONFIG.items() if k != 'database'}
+        conn = mysql.connector.connect(**server)
+        load_schema(conn, database)
+        conn.close()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        counts = seed(conn, args)
+    finally:
+        conn.close()
+    print(f"Seeded {database}: " + ', '.join(f"{k}={v}" for k, v in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
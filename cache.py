@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_TTL
+
+
+class MemoryCache:
+    """In-process cache with per-entry TTL and LRU eviction.
+
+    Each gunicorn worker has its own copy, so invalidation only reaches the
+    process that calls it; the TTL bounds staleness everywhere else. A
+    shared backend only needs the same get/set/delete_prefix/clear methods.
+    """
+
+    def __init__(self, max_entries=1000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self._stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._data)
+        return stats
+
+
+_MISSING = object()
+
+
+def get_or_set(key, fn, ttl=None):
+    """Return the cached value for `key`, computing and storing it with fn() on a miss."""
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = fn()
+        cache.set(key, value, ttl)
+    return value
+
+
+def invalidate_headlines():
+    """Drop everything derived from news_headlines (pages, counts, stats)."""
+    cache.delete_prefix('headlines:')
+
+
+BACKENDS = {
+    'memory': MemoryCache,
+}
+
+cache = BACKENDS[CACHE_BACKEND](max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
@@ -0,0 +1,109 @@
+import re
+
+# Category keywords, in priority order (earlier categories win ties)
+CATEGORY_KEYWORDS = {
+    'Politics': ['election', 'government', 'minister', 'parliament', 'politics', 'political', 'congress', 'bjp', 'vote', 'pm', 'president'],
+    'Technology': ['tech', 'technology', 'ai', 'software', 'hardware', 'computer', 'app', 'digital', 'cyber', 'internet', 'smartphone', 'gadget'],
+    'Sports': ['cricket', 'football', 'sports', 'match', 'player', 'ipl', 'fifa', 'olympics', 'tournament', 'champion', 'goal', 'score'],
+    'Business': ['business', 'economy', 'market', 'stock', 'finance', 'company', 'corporate', 'industry', 'trade', 'investment', 'rupee', 'revenue'],
+    'Entertainment': ['movie', 'film', 'actor', 'actress', 'bollywood', 'hollywood', 'music', 'celebrity', 'entertainment', 'show', 'series'],
+    'Health': ['health', 'medical', 'doctor', 'hospital', 'disease', 'vaccine', 'covid', 'medicine', 'treatment', 'patient'],
+    'Science': ['science', 'research', 'study', 'scientist', 'space', 'nasa', 'isro', 'discovery', 'experiment'],
+    'World': ['world', 'international', 'global', 'country', 'nation', 'usa', 'china', 'europe', 'war', 'peace'],
+    'Education': ['education', 'school', 'college', 'university', 'student', 'exam', 'admission', 'degree', 'learning']
+}
+
+DEFAULT_CATEGORY = 'General'
+
+# Title matches count for more than description matches when scoring
+TITLE_WEIGHT = 2
+
+
+def _trie_pattern(words):
+    """Build a regex alternation of `words` factored on shared prefixes.
+
+    A flat 'election|elections|...' alternation retries every keyword at
+    each position; the factored form rejects most words after a character
+    or two, so only keywords ever leave the regex engine.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        group = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{group})?' if '' in node else group
+
+    return build(trie)
+
+
+class CategoryClassifier:
+    """Keyword classifier compiled once into a single regex.
+
+    Keywords match whole words only (with an optional plural 's'/'es'):
+    'ai' no longer matches 'said' and 'pm' no longer matches 'shipment'.
+    One findall returns just the keywords in the text and each one is a dict
+    lookup to its category.
+    """
+
+    def __init__(self, keywords, default=DEFAULT_CATEGORY):
+        self.default = default
+        self.priority = {category: i for i, category in enumerate(keywords)}
+        self.keyword_category = {}
+        for category, words in keywords.items():
+            for word in words:
+                # First category listing a keyword owns it
+                self.keyword_category.setdefault(word.lower(), category)
+        # Index plural forms too so matching is a single lookup per word
+        self.index = dict(self.keyword_category)
+        for word, category in self.keyword_category.items():
+            self.index.setdefault(word + 's', category)
+            self.index.setdefault(word + 'es', category)
+        # Words are runs of [a-z0-9]; the lookarounds keep a keyword from
+        # matching inside a longer word
+        self._find = re.compile(
+            rf"(?<![a-z0-9])({_trie_pattern(self.index)})(?![a-z0-9])"
+        ).findall
+
+    def _categories(self, text):
+        return list(map(self.index.__getitem__, self._find(text.lower())))
+
+    def _hits(self, title, description):
+        """One entry per keyword hit, title hits repeated TITLE_WEIGHT times."""
+        hits = self._categories(title) * TITLE_WEIGHT if title else []
+        if description:
+            hits += self._categories(description)
+        return hits
+
+    def scores(self, title, description=''):
+        """Return {category: weighted keyword hits} for a headline."""
+        scores = {}
+        for category in self._hits(title, description):
+            scores[category] = scores.get(category, 0) + 1
+        return scores
+
+    def classify(self, title, description='', scored=True):
+        """Return the best category for a headline.
+
+        With `scored` the category with the most weighted hits wins (ties go
+        to the earlier category); otherwise the first category with any hit
+        wins, like the original substring matcher.
+        """
+        hits = self._hits(title, description)
+        if not hits:
+            return self.default
+        if hits.count(hits[0]) == len(hits):
+            return hits[0]
+        priority = self.priority
+        if not scored:
+            return min(hits, key=priority.__getitem__)
+        return min(set(hits), key=lambda c: (-hits.count(c), priority[c]))
+
+
+classifier = CategoryClassifier(CATEGORY_KEYWORDS)
@@ -3,6 +3,7 @@ import os
 # Database Configuration
 DB_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '3306')),
     'user': os.getenv('DB_USER', 'root'),
     'password': os.getenv('DB_PASSWORD', ''),
     'database': os.getenv('DB_NAME', 'news07')
@@ -13,4 +14,122 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
 # Pagination
-HEADLINES_PER_PAGE = 12
\ No newline at end of file
+HEADLINES_PER_PAGE = 12
+
+# Request threads per gunicorn gthread worker (see Procfile)
+WEB_THREADS = int(os.getenv('WEB_THREADS', '16'))
+
+# Database connection pool (per process). Connections open lazily; the
+# default gives every request thread one, plus the background threads that
+# share the pool: the scheduler (two while scraping; rollups and retention
+# run on it between scrapes), lease heartbeat, visit logger and live poller.
+DB_BACKGROUND_CONNECTIONS = 5
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', str(WEB_THREADS + DB_BACKGROUND_CONNECTIONS)))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', '30'))
+
+# Read replicas: comma-separated host[:port] list sharing DB_CONFIG's user,
+# password and database, e.g. DB_REPLICAS=127.0.0.1:3309. Empty = primary only.
+DB_REPLICAS = [
+    dict(DB_CONFIG, host=host, port=int(port or DB_CONFIG['port']),
+         connection_timeout=int(os.getenv('DB_REPLICA_CONNECT_TIMEOUT', '3')))
+    for host, _, port in (r.strip().partition(':') for r in os.getenv('DB_REPLICAS', '').split(','))
+    if host
+]
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '5'))
+DB_REPLICA_MAX_LAG = int(os.getenv('DB_REPLICA_MAX_LAG', '30'))  # seconds behind the primary
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '30'))  # session reads the primary after a write
+
+# Seconds to reuse headline COUNT(*) totals for page links
+COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', '60'))
+
+# Buffered visit logging
+VISIT_LOG_QUEUE_SIZE = int(os.getenv('VISIT_LOG_QUEUE_SIZE', '10000'))
+VISIT_LOG_BATCH_SIZE = int(os.getenv('VISIT_LOG_BATCH_SIZE', '200'))
+VISIT_LOG_FLUSH_INTERVAL = float(os.getenv('VISIT_LOG_FLUSH_INTERVAL', '2'))
+
+# Seconds after an hour ends before its visit_hourly counts are final; must
+# exceed how long a visit can sit in the logger queue before it is written
+VISIT_ROLLUP_LAG_SECONDS = int(os.getenv('VISIT_ROLLUP_LAG_SECONDS', '600'))
+
+# Scraper HTTP fetching
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', '8'))
+SCRAPE_TIMEOUT = float(os.getenv('SCRAPE_TIMEOUT', '10'))
+SCRAPE_HOST_TIMEOUTS = {}  # e.g. {'www.indiatoday.in': 20}
+SCRAPE_RETRIES = int(os.getenv('SCRAPE_RETRIES', '2'))
+SCRAPE_RETRY_BACKOFF = float(os.getenv('SCRAPE_RETRY_BACKOFF', '0.5'))
+
+# Rows fetched per round-trip when streaming report exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+
+# Query/fragment cache
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_TTL = int(os.getenv('CACHE_TTL', '300'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1000'))
+
+# Background scrape scheduler
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'True').lower() == 'true'
+SCHEDULER_TICK = float(os.getenv('SCHEDULER_TICK', '30'))
+SCRAPE_INTERVAL = int(os.getenv('SCRAPE_INTERVAL', '900'))  # default; news_sources.scrape_interval overrides
+
+# Sharded scraping: sources per lease batch, lease lifetime and heartbeat period
+SCRAPE_BATCH_SIZE = int(os.getenv('SCRAPE_BATCH_SIZE', '50'))
+SCRAPE_LEASE_SECONDS = int(os.getenv('SCRAPE_LEASE_SECONDS', '120'))
+SCRAPE_HEARTBEAT_INTERVAL = float(os.getenv('SCRAPE_HEARTBEAT_INTERVAL', '30'))
+
+# Near-duplicate story detection at ingest
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'True').lower() == 'true'
+DEDUP_WINDOW_HOURS = int(os.getenv('DEDUP_WINDOW_HOURS', '48'))
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.6'))
+
+# Seconds shared caches may reuse public JSON API responses
+API_MAX_AGE = int(os.getenv('API_MAX_AGE', '30'))
+
+# Request profiling
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', '100'))
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # fraction of requests run under cProfile
+PROFILE_ROUTES = [r for r in os.getenv('PROFILE_ROUTES', '').split(',') if r]  # e.g. '/,/search'; empty = all
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+# Retention: visit_logs partitions and old headlines are archived to gzip CSV
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+VISIT_RETENTION_MONTHS = int(os.getenv('VISIT_RETENTION_MONTHS', '6'))
+HEADLINE_RETENTION_DAYS = int(os.getenv('HEADLINE_RETENTION_DAYS', '180'))  # favorited headlines are kept
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', '3600'))  # seconds between runs; 0 disables
+
+# Image proxy: cards load local WebP thumbnails instead of hotlinking full-size images
+IMAGE_PROXY_ENABLED = os.getenv('IMAGE_PROXY_ENABLED', 'True').lower() == 'true'
+IMAGE_PREFETCH = os.getenv('IMAGE_PREFETCH', 'True').lower() == 'true'  # build thumbnails at ingest
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', 'image_cache')
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv('IMAGE_MAX_SOURCE_BYTES', str(10 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv('IMAGE_FETCH_TIMEOUT', '10'))
+IMAGE_ALLOW_PRIVATE_HOSTS = os.getenv('IMAGE_ALLOW_PRIVATE_HOSTS', 'False').lower() == 'true'  # e.g. a local fixture server
+THUMBNAIL_SIZE = (480, 270)
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', '70'))
+
+# Static assets are fingerprinted and precompressed at startup (or by `python assets.py`)
+ASSET_BUILD_ON_STARTUP = os.getenv('ASSET_BUILD_ON_STARTUP', 'True').lower() == 'true'
+# Dynamic HTML/JSON responses at least this large are gzip/brotli compressed
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
+
+# Live headline stream (Server-Sent Events). Under app:app each open stream
+# holds one of the gthread worker's WEB_THREADS threads, so by default at
+# most half of them stream; asgi.py streams on its event loop.
+LIVE_MAX_CONNECTIONS = int(os.getenv('LIVE_MAX_CONNECTIONS', str(max(1, WEB_THREADS // 2))))  # per process
+LIVE_ASYNC_MAX_CONNECTIONS = int(os.getenv('LIVE_ASYNC_MAX_CONNECTIONS', '1000'))  # per asgi.py process
+LIVE_HEARTBEAT_INTERVAL = int(os.getenv('LIVE_HEARTBEAT_INTERVAL', '15'))
+LIVE_MAX_STREAM_SECONDS = int(os.getenv('LIVE_MAX_STREAM_SECONDS', '900'))  # then the browser reconnects
+LIVE_REPLAY_SIZE = int(os.getenv('LIVE_REPLAY_SIZE', '200'))
+LIVE_QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '100'))
+LIVE_POLL_INTERVAL = float(os.getenv('LIVE_POLL_INTERVAL', '5'))  # picks up other processes' inserts; 0 disables
+LIVE_POLL_OVERLAP = int(os.getenv('LIVE_POLL_OVERLAP', '60'))  # seconds each poll re-reads, for inserts that commit late
+
+# ASGI serving mode (asgi.py): aiomysql connections per worker process, and
+# threads for the routes still served by the Flask app
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '20'))
+ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '10'))
@@ -0,0 +1,37 @@
+-- Upgrade a news_headlines table created before the url_hash unique key.
+-- Fresh databases get the key from schema.sql.
+--
+--   mysql -u root -p news_07 < database/migrations/dedupe_headline_urls.sql
+--
+-- The unique index cannot be built while a URL is stored more than once, so
+-- each URL keeps its oldest row. Favorites of the removed copies move to it
+-- first; a user who saved several copies keeps one favorite.
+USE news_07;
+
+ALTER TABLE news_headlines
+    ADD COLUMN url_hash BINARY(32) AS (UNHEX(SHA2(url, 256))) STORED AFTER url;
+
+CREATE TEMPORARY TABLE headline_url_keep (
+    url_hash BINARY(32) PRIMARY KEY,
+    keep_id INT NOT NULL
+);
+INSERT INTO headline_url_keep (url_hash, keep_id)
+SELECT url_hash, MIN(headline_id)
+FROM news_headlines
+GROUP BY url_hash
+HAVING COUNT(*) > 1;
+
+UPDATE IGNORE favorites f
+JOIN news_headlines h ON h.headline_id = f.headline_id
+JOIN headline_url_keep k ON k.url_hash = h.url_hash
+SET f.headline_id = k.keep_id
+WHERE f.headline_id <> k.keep_id;
+
+-- Remaining favorites of the copies (already saved on the kept row) cascade
+DELETE h FROM news_headlines h
+JOIN headline_url_keep k ON k.url_hash = h.url_hash
+WHERE h.headline_id <> k.keep_id;
+
+DROP TEMPORARY TABLE headline_url_keep;
+
+ALTER TABLE news_headlines ADD UNIQUE KEY unique_headline_url (url_hash);
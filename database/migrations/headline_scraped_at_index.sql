@@ -0,0 +1,7 @@
+-- Index news_headlines.scraped_at for the live stream poller (live.py).
+-- Fresh databases get the index from schema.sql.
+--
+--   mysql -u root -p news_07 < database/migrations/headline_scraped_at_index.sql
+USE news_07;
+
+CREATE INDEX idx_headline_scraped ON news_headlines(scraped_at);
@@ -0,0 +1,16 @@
+-- Re-key a story_sources table created with PRIMARY KEY (headline_id, source_id).
+-- Fresh databases get the new keys from schema.sql.
+--
+--   mysql -u root -p news_07 < database/migrations/story_sources_url_key.sql
+--
+-- The old key kept one URL per outlet per story; a second near-duplicate
+-- from the same outlet was dropped and re-checked on every scrape. Rows are
+-- already unique by URL, so no data has to change.
+USE news_07;
+
+ALTER TABLE story_sources
+    MODIFY url_hash BINARY(32) AS (UNHEX(SHA2(url, 256))) STORED NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (url_hash),
+    ADD INDEX idx_story_source (headline_id, source_id),
+    DROP INDEX unique_story_url;
@@ -0,0 +1,5 @@
+-- Replication account; kept out of the binlog so the replica doesn't replay it
+SET SQL_LOG_BIN = 0;
+CREATE USER 'repl'@'%' IDENTIFIED WITH mysql_native_password BY 'repl';
+GRANT REPLICATION SLAVE ON *.* TO 'repl'@'%';
+SET SQL_LOG_BIN = 1;
@@ -0,0 +1,9 @@
+-- Follow the primary from its first transaction (GTID auto-positioning)
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'primary',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'repl',
+    SOURCE_PASSWORD = 'repl',
+    SOURCE_AUTO_POSITION = 1,
+    SOURCE_CONNECT_RETRY = 5;
+START REPLICA;
@@ -24,7 +24,57 @@ CREATE TABLE news_sources (
     source_id INT AUTO_INCREMENT PRIMARY KEY,
     source_name VARCHAR(100) NOT NULL,
     source_url VARCHAR(255) NOT NULL,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    scrape_interval INT NULL,  -- seconds between scrapes; NULL uses SCRAPE_INTERVAL
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY unique_source_url (source_url)
+);
+
+-- 3b. Feed State (conditional fetch validators and last scrape result per source)
+CREATE TABLE feed_state (
+    source_id INT PRIMARY KEY,
+    etag VARCHAR(255),
+    last_modified VARCHAR(64),
+    content_hash CHAR(64),
+    checked_at DATETIME,
+    last_run_at DATETIME,
+    last_duration FLOAT,
+    last_new INT DEFAULT 0,
+    last_error VARCHAR(500),
+    FOREIGN KEY (source_id) REFERENCES news_sources(source_id) ON DELETE CASCADE
+);
+
+-- 3c. Scrape Jobs (queued by /scrape, run by the background scheduler)
+CREATE TABLE scrape_jobs (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    requested_by INT NULL,
+    status ENUM('pending', 'running', 'done', 'failed') NOT NULL DEFAULT 'pending',
+    requested_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    finished_at DATETIME,
+    new_headlines INT DEFAULT 0,
+    error VARCHAR(500),
+    worker_id VARCHAR(100) NULL,
+    INDEX idx_scrape_job_status (status)
+);
+
+-- 3d. Scrape Workers (every scheduler process, with its last heartbeat)
+CREATE TABLE scrape_workers (
+    worker_id VARCHAR(100) PRIMARY KEY,
+    hostname VARCHAR(255),
+    pid INT,
+    started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    heartbeat_at DATETIME
+);
+
+-- 3e. Scrape Leases (which worker owns each source until leased_until)
+CREATE TABLE scrape_leases (
+    source_id INT PRIMARY KEY,
+    worker_id VARCHAR(100) NULL,
+    leased_until DATETIME NULL,
+    claimed_at DATETIME NULL,
+    INDEX idx_lease_worker (worker_id),
+    FOREIGN KEY (source_id) REFERENCES news_sources(source_id) ON DELETE CASCADE
 );
 
 -- 4. News Headlines Table (with category)
@@ -33,15 +83,33 @@ CREATE TABLE news_headlines (
     title TEXT NOT NULL,
     description TEXT,
     url VARCHAR(500) NOT NULL,
+    url_hash BINARY(32) AS (UNHEX(SHA2(url, 256))) STORED,
     image_url VARCHAR(500),
     source_id INT,
     category_id INT DEFAULT 1,
     publish_date DATETIME,
     scraped_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    minhash VARBINARY(128),
+    UNIQUE KEY unique_headline_url (url_hash),
     FOREIGN KEY (source_id) REFERENCES news_sources(source_id) ON DELETE CASCADE,
     FOREIGN KEY (category_id) REFERENCES categories(category_id) ON DELETE SET NULL
 );
 
+-- 4b. Story Sources (other outlets' near-duplicate copies of a headline)
+CREATE TABLE story_sources (
+    headline_id INT NOT NULL,
+    source_id INT NOT NULL,
+    url VARCHAR(500) NOT NULL,
+    url_hash BINARY(32) AS (UNHEX(SHA2(url, 256))) STORED NOT NULL,
+    linked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    -- Keyed by URL: one outlet can carry a story under several URLs, and
+    -- each is recorded so later scrapes skip it
+    PRIMARY KEY (url_hash),
+    INDEX idx_story_source (headline_id, source_id),
+    FOREIGN KEY (headline_id) REFERENCES news_headlines(headline_id) ON DELETE CASCADE,
+    FOREIGN KEY (source_id) REFERENCES news_sources(source_id) ON DELETE CASCADE
+);
+
 -- 5. Favorites Table
 CREATE TABLE favorites (
     fav_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -66,6 +134,15 @@ INSERT INTO categories (category_name, category_icon) VALUES
 ('World', '🌍'),
 ('Education', '📚');
 
+-- Per-category headline counters, kept up to date by the scraper at ingest
+CREATE TABLE category_counts (
+    category_id INT PRIMARY KEY,
+    headline_count INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (category_id) REFERENCES categories(category_id) ON DELETE CASCADE
+);
+INSERT INTO category_counts (category_id, headline_count)
+SELECT category_id, 0 FROM categories;
+
 -- Insert default news sources
 INSERT INTO news_sources (source_name, source_url) VALUES
 ('NDTV', 'https://feeds.feedburner.com/ndtvnews-latest'),
@@ -73,16 +150,42 @@ INSERT INTO news_sources (source_name, source_url) VALUES
 ('Hindustan Times', 'https://www.hindustantimes.com/feeds/rss/latest-news/rssfeed.xml');
 
 -- Create indexes for better performance
-CREATE INDEX idx_headline_date ON news_headlines(publish_date DESC);
+CREATE INDEX idx_headline_date ON news_headlines(publish_date DESC, headline_id DESC);
+CREATE INDEX idx_headline_category_date ON news_headlines(category_id, publish_date DESC, headline_id DESC);
 CREATE INDEX idx_user_favorites ON favorites(user_id);
 CREATE INDEX idx_headline_source ON news_headlines(source_id);
+-- The live stream poller (live.py) reads recently stored headlines
+CREATE INDEX idx_headline_scraped ON news_headlines(scraped_at);
+CREATE FULLTEXT INDEX idx_headline_fulltext ON news_headlines(title, description);
 
--- Visitor tracking
+-- Visitor tracking, partitioned by month so expired months can be archived
+-- and dropped whole (retention.py adds upcoming partitions by splitting p_future)
 CREATE TABLE IF NOT EXISTS visit_logs (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     user_id INT NULL,
     ip_address VARCHAR(50),
     visited_page VARCHAR(200),
-    visited_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    visited_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, visited_at)
+)
+PARTITION BY RANGE COLUMNS (visited_at) (
+    PARTITION p_start VALUES LESS THAN ('2025-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
+CREATE INDEX idx_headline_category ON news_headlines(category_id);
+CREATE INDEX idx_visit_date ON visit_logs(visited_at);
+
+-- Hourly visit rollup, built incrementally from visit_logs
+CREATE TABLE visit_hourly (
+    hour_start DATETIME NOT NULL,
+    visited_page VARCHAR(200) NOT NULL,
+    visits INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour_start, visited_page)
+);
+
+-- Rollup progress: for visit_hourly the end of the last hour that is final,
+-- for category_counts when the counters were last rebuilt from news_headlines
+CREATE TABLE rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    rolled_up_to DATETIME NULL
 );
-CREATE INDEX idx_headline_category ON news_headlines(category_id);
\ No newline at end of file
@@ -0,0 +1,308 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+from config import (DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_PING_INTERVAL,
+                    DB_REPLICAS, DB_REPLICA_CHECK_INTERVAL, DB_REPLICA_MAX_LAG)
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections shared by the web app and scraper.
+
+    Connections are opened lazily up to `size`. When every connection is
+    checked out, callers wait up to `timeout` seconds for one to be returned
+    before a PoolError is raised.
+    """
+
+    def __init__(self, config, size=5, timeout=10, ping_interval=30):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            'checkouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'exhausted': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'discarded': 0,
+        }
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._stats['connects'] += 1
+        return conn
+
+    def discard(self, conn):
+        """Close a checked-out connection instead of returning it.
+
+        The slot is freed, so the next acquire opens a fresh connection.
+        """
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._stats['discarded'] += 1
+
+    def _check_health(self, conn, last_used):
+        """Ping connections that sat idle too long; replace dead ones."""
+        if time.monotonic() - last_used < self.ping_interval:
+            return conn
+        if conn.is_connected():
+            return conn
+        try:
+            conn.reconnect(attempts=1)
+            with self._lock:
+                self._stats['reconnects'] += 1
+            return conn
+        except mysql.connector.Error:
+            pass
+        # Reconnect failed: swap in a fresh connection, keeping the slot
+        try:
+            conn.close()
+        except Exception:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def acquire(self):
+        """Check a connection out of the pool."""
+        start = time.monotonic()
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+                else:
+                    self._stats['exhausted'] += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                last_used = time.monotonic()
+            else:
+                try:
+                    conn, last_used = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise PoolError(f"No database connection available after {self.timeout}s")
+
+        conn = self._check_health(conn, last_used)
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['wait_time_total'] += waited
+            self._stats['wait_time_max'] = max(self._stats['wait_time_max'], waited)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            self.discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        checkouts = stats['checkouts'] or 1
+        stats['wait_time_avg'] = stats['wait_time_total'] / checkouts
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    DB_CONFIG,
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    ping_interval=DB_POOL_PING_INTERVAL,
+                )
+    return _pool
+
+
+class Replica:
+    def __init__(self, config, pool):
+        self.name = f"{config['host']}:{config['port']}"
+        self.config = config
+        self.pool = pool
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+
+class ReplicaRouter:
+    """Sends read-only work to healthy replicas, falling back to the primary.
+
+    A background thread checks every replica each `check_interval` seconds.
+    A replica takes reads only while it answers and is at most `max_lag`
+    seconds behind the primary (from SHOW REPLICA STATUS; a server with no
+    replication configured is never used). Until the first check passes, and
+    whenever no replica is healthy, reads go to the primary. Healthy
+    replicas are used round-robin.
+    """
+
+    def __init__(self, replica_configs, pool_size=5, pool_timeout=10, check_interval=5, max_lag=30):
+        self.replicas = [Replica(config, ConnectionPool(config, size=pool_size, timeout=pool_timeout,
+                                                        ping_interval=DB_POOL_PING_INTERVAL))
+                         for config in replica_configs]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'replica_reads': 0, 'primary_reads': 0, 'failovers': 0}
+
+    def ensure_started(self):
+        if not self.replicas or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='replica-health', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            for replica in self.replicas:
+                self.check(replica)
+            time.sleep(self.check_interval)
+
+    def check(self, replica):
+        """Update a replica's health from its replication status."""
+        try:
+            conn = replica.pool.acquire()
+            try:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("SHOW REPLICA STATUS")
+                status = cursor.fetchone()
+                cursor.fetchall()
+                cursor.close()
+            finally:
+                replica.pool.release(conn)
+        except Exception as e:
+            self.mark_down(replica, e)
+            return
+        if status is None:
+            # A misconfigured DB_REPLICAS entry (or the primary itself) must not take reads
+            lag, error = None, 'not a replica'
+        else:
+            lag = status.get('Seconds_Behind_Source')
+            error = status.get('Last_Error') or (None if lag is not None else 'replication stopped')
+        healthy = lag is not None and lag <= self.max_lag
+        if healthy and not replica.healthy:
+            logger.info("Replica %s is up (lag %ss)", replica.name, lag)
+        elif not healthy and (replica.healthy or replica.checked_at is None):
+            logger.warning("Replica %s is down: lag %s, %s", replica.name, lag, error)
+        replica.healthy, replica.lag, replica.error = healthy, lag, error
+        replica.checked_at = time.time()
+
+    def mark_down(self, replica, error):
+        if replica.healthy:
+            logger.warning("Replica %s is down: %s", replica.name, error)
+            with self._lock:
+                self._stats['failovers'] += 1
+        replica.healthy = False
+        replica.error = str(error)
+        replica.checked_at = time.time()
+
+    def choose(self):
+        """Return the next healthy replica, or None to use the primary."""
+        self.ensure_started()
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def acquire_replica(self):
+        """Check out a replica connection as (pool, conn), or None when reads should use the primary."""
+        replica = self.choose()
+        if replica is not None:
+            try:
+                conn = replica.pool.acquire()
+                with self._lock:
+                    self._stats['replica_reads'] += 1
+                return replica.pool, conn
+            except PoolError:
+                pass  # busy, not broken
+            except Exception as e:
+                self.mark_down(replica, e)
+        with self._lock:
+            self._stats['primary_reads'] += 1
+        return None
+
+    def acquire_read(self):
+        """Check out a read connection as (pool, conn), from the primary if no replica can serve."""
+        replica = self.acquire_replica()
+        if replica is not None:
+            return replica
+        pool = get_pool()
+        return pool, pool.acquire()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['replicas'] = [{'name': r.name, 'healthy': r.healthy, 'lag': r.lag, 'error': r.error,
+                              'checked_at': r.checked_at, 'pool': r.pool.stats()}
+                             for r in self.replicas]
+        return stats
+
+
+_router = None
+
+
+def get_router():
+    """Return the process-wide replica router (reads go to the primary without DB_REPLICAS)."""
+    global _router
+    if _router is None:
+        with _pool_lock:
+            if _router is None:
+                _router = ReplicaRouter(
+                    DB_REPLICAS,
+                    pool_size=DB_POOL_SIZE,
+                    pool_timeout=DB_POOL_TIMEOUT,
+                    check_interval=DB_REPLICA_CHECK_INTERVAL,
+                    max_lag=DB_REPLICA_MAX_LAG,
+                )
+    return _router
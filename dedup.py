@@ -0,0 +1,122 @@
+import hashlib
+import random
+import re
+import struct
+
+from config import DEDUP_WINDOW_HOURS, DEDUP_THRESHOLD
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words too common to say anything about which story a headline is
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have he her his in is it its of on or
+says said she that the their they this to was were will with after over amid
+""".split())
+
+NUM_PERM = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_rng = random.Random(1610)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text):
+    """The set of meaningful words in `text`."""
+    return {t for t in _WORD_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1}
+
+
+def minhash(text):
+    """MinHash signature (NUM_PERM 32-bit values) of the words in `text`.
+
+    The fraction of positions where two signatures agree estimates the
+    Jaccard similarity of the two word sets.
+    """
+    hashes = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), 'big')
+              for t in shingles(text)]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in _PERMUTATIONS)
+
+
+def headline_signature(title, description):
+    return minhash(f"{title} {description or ''}")
+
+
+def pack_signature(signature):
+    """Serialise a signature for the news_headlines.minhash column."""
+    return struct.pack(f'>{NUM_PERM}I', *signature) if signature else None
+
+
+def unpack_signature(data):
+    return struct.unpack(f'>{NUM_PERM}I', data) if data else None
+
+
+def similarity(a, b):
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+class MinHashIndex:
+    """LSH index of recent headline signatures.
+
+    Signatures are split into BANDS bands; only headlines that agree on a
+    whole band are compared, and a match needs an estimated Jaccard
+    similarity of at least `threshold`. An index lives for one scrape run
+    (see load_dedup_index), so it never holds headlines older than the
+    window plus the length of the run.
+    """
+
+    def __init__(self, threshold=0.6):
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(BANDS)]
+        self._signatures = {}  # headline_id -> signature
+
+    @staticmethod
+    def _band_keys(signature):
+        return [signature[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND] for i in range(BANDS)]
+
+    def add(self, headline_id, signature):
+        if signature is None:
+            return
+        self._signatures[headline_id] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(headline_id)
+
+    def find(self, signature):
+        """Return the most similar headline_id at or above the threshold, or None."""
+        if signature is None:
+            return None
+        best, best_score = None, self.threshold
+        seen = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            for headline_id in bucket.get(key, ()):
+                if headline_id in seen:
+                    continue
+                seen.add(headline_id)
+                score = similarity(self._signatures[headline_id], signature)
+                if score >= best_score:
+                    best, best_score = headline_id, score
+        return best
+
+    def __len__(self):
+        return len(self._signatures)
+
+
+def load_dedup_index(conn):
+    """Build an index of the canonical headlines published within the window.
+
+    Called at the start of each scrape run, so the window moves with the runs.
+    """
+    index = MinHashIndex(DEDUP_THRESHOLD)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT headline_id, minhash
+        FROM news_headlines
+        WHERE publish_date >= NOW() - INTERVAL %s HOUR AND minhash IS NOT NULL
+    """, (DEDUP_WINDOW_HOURS,))
+    for headline_id, data in cursor.fetchall():
+        index.add(headline_id, unpack_signature(bytes(data)))
+    cursor.close()
+    return index
@@ -0,0 +1,253 @@
+import hashlib
+import hmac
+import io
+import ipaddress
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+from PIL import Image, ImageOps
+
+from config import (SECRET_KEY, IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES, IMAGE_MAX_SOURCE_BYTES,
+                    IMAGE_FETCH_TIMEOUT, IMAGE_ALLOW_PRIVATE_HOSTS, THUMBNAIL_SIZE, THUMBNAIL_QUALITY)
+from cache import cache
+
+# Resampling filter for downscaling
+RESAMPLE = Image.Resampling.LANCZOS
+
+# Retry a failed image no sooner than this
+FAILURE_TTL = 600
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def sign_url(url):
+    """Signature that lets /img fetch `url`; only URLs the app rendered can be proxied."""
+    return hmac.new(SECRET_KEY.encode(), url.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def verify_url(url, signature):
+    return hmac.compare_digest(sign_url(url), signature or '')
+
+
+def make_thumbnail(data, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Crop-and-scale image bytes to exactly `size` and encode as WebP."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft('RGB', (size[0] * 2, size[1] * 2))  # let JPEG decode at reduced scale
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Flatten transparency onto white, as the card background is
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        thumb = ImageOps.fit(img, size, method=RESAMPLE)
+        out = io.BytesIO()
+        thumb.save(out, 'WEBP', quality=quality, method=4)
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    """Content-addressed on-disk store of thumbnails, bounded to `max_bytes`.
+
+    Thumbnails live at blobs/<sha256 of the thumbnail>.webp, so identical
+    images behind different URLs are stored once; urls/<sha256 of the URL>
+    holds the blob name for each source URL. When the blobs exceed
+    `max_bytes` the least recently served ones are deleted (reads bump the
+    file mtime).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._blobs = os.path.join(directory, 'blobs')
+        self._urls = os.path.join(directory, 'urls')
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._size = None
+        self._stats = {'hits': 0, 'misses': 0, 'failures': 0, 'evictions': 0}
+
+    def _blob_path(self, digest):
+        return os.path.join(self._blobs, digest[:2], digest + '.webp')
+
+    def _url_path(self, key):
+        return os.path.join(self._urls, key[:2], key)
+
+    def _lookup(self, key):
+        try:
+            with open(self._url_path(key)) as f:
+                path = self._blob_path(f.read().strip())
+            os.utime(path)
+            return path
+        except OSError:
+            return None
+
+    def _store(self, key, thumbnail):
+        digest = hashlib.sha256(thumbnail).hexdigest()
+        path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(thumbnail)
+            os.replace(tmp, path)
+            with self._lock:
+                if self._size is not None:
+                    self._size += len(thumbnail)
+        url_path = self._url_path(key)
+        os.makedirs(os.path.dirname(url_path), exist_ok=True)
+        tmp = f"{url_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(digest)
+        os.replace(tmp, url_path)
+        return path
+
+    def get(self, url, fetch):
+        """Return the thumbnail path for `url`, creating it with fetch(url) on a miss.
+
+        Concurrent misses for the same URL in this process share one fetch.
+        Returns None if the image could not be fetched or decoded.
+        """
+        key = url_key(url)
+        path = self._lookup(key)
+        if path:
+            with self._lock:
+                self._stats['hits'] += 1
+            return path
+        if cache.get(f"thumbnail-failed:{key}"):
+            return None
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait(IMAGE_FETCH_TIMEOUT * 2)
+            return self._lookup(key)
+
+        try:
+            with self._lock:
+                self._stats['misses'] += 1
+            try:
+                path = self._store(key, make_thumbnail(fetch(url)))
+            except Exception as e:
+                with self._lock:
+                    self._stats['failures'] += 1
+                cache.set(f"thumbnail-failed:{key}", True, ttl=FAILURE_TTL)
+                print(f"Thumbnail failed for {url}: {e}")
+                return None
+            self._evict_if_needed()
+            return path
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def _scan(self):
+        blobs = []
+        for root, _, files in os.walk(self._blobs):
+            for name in files:
+                if name.endswith('.webp'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    blobs.append((st.st_mtime, st.st_size, path))
+        return blobs
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            if self._size <= self.max_bytes:
+                return
+            # Evict down to 90% so we don't rescan on every miss
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(self._scan()):
+                if self._size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                self._stats['evictions'] += 1
+        # Orphaned urls/ entries are harmless: a lookup of a missing blob is a miss
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['bytes'] = self._size
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+_session = requests.Session()
+_session.headers['User-Agent'] = 'Mozilla/5.0'
+
+
+def is_public_host(hostname):
+    """True if every address `hostname` resolves to is publicly routable."""
+    try:
+        infos = socket.getaddrinfo(hostname, None)
+    except OSError:
+        return False
+    return all(ipaddress.ip_address(info[4][0]).is_global for info in infos)
+
+
+def check_image_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError('unsupported URL')
+    if not IMAGE_ALLOW_PRIVATE_HOSTS and not is_public_host(parsed.hostname):
+        raise ValueError('refusing to fetch from a private address')
+
+
+def fetch_image(url, max_redirects=3):
+    """Download an image, refusing non-HTTP URLs, non-images and oversized bodies.
+
+    Feed-supplied URLs (and redirect targets) pointing into the local
+    network are refused unless IMAGE_ALLOW_PRIVATE_HOSTS is set.
+    """
+    for _ in range(max_redirects + 1):
+        check_image_url(url)
+        with _session.get(url, timeout=IMAGE_FETCH_TIMEOUT, stream=True, allow_redirects=False) as r:
+            if r.is_redirect:
+                url = urljoin(url, r.headers['Location'])
+                continue
+            r.raise_for_status()
+            content_type = r.headers.get('Content-Type', '')
+            if content_type and not content_type.startswith('image/'):
+                raise ValueError(f'not an image: {content_type}')
+            data = io.BytesIO()
+            for chunk in r.iter_content(64 * 1024):
+                data.write(chunk)
+                if data.tell() > IMAGE_MAX_SOURCE_BYTES:
+                    raise ValueError('image too large')
+            return data.getvalue()
+    raise ValueError('too many redirects')
+
+
+def get_thumbnail(url):
+    return thumbnails.get(url, fetch_image)
+
+
+_prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='thumbnail-prefetch')
+
+
+def prefetch_thumbnails(urls):
+    """Warm the cache for newly ingested images in the background."""
+    for url in urls:
+        _prefetcher.submit(get_thumbnail, url)
+
+
+thumbnails = ThumbnailCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
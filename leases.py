@@ -0,0 +1,129 @@
+import os
+import socket
+import threading
+import uuid
+
+from db import get_pool
+
+
+def new_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class SourceLeases:
+    """Splits news_sources between scrape workers using expiring lease rows.
+
+    A worker claims a batch of due sources by setting scrape_leases.worker_id
+    and leased_until; SELECT ... FOR UPDATE SKIP LOCKED keeps two workers from
+    claiming the same row. While it holds leases, a heartbeat thread keeps
+    extending them. If the worker dies, its leases lapse after
+    `lease_seconds` and other workers pick those sources up.
+    """
+
+    def __init__(self, worker_id, lease_seconds=120, heartbeat_interval=30, default_interval=900):
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.default_interval = default_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO scrape_workers (worker_id, hostname, pid, heartbeat_at)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE heartbeat_at = NOW()
+        """, (self.worker_id, socket.gethostname(), os.getpid()))
+        conn.commit()
+        cursor.close()
+
+    def heartbeat(self, conn):
+        """Mark this worker alive and extend the leases it still holds."""
+        cursor = conn.cursor()
+        cursor.execute("UPDATE scrape_workers SET heartbeat_at = NOW() WHERE worker_id = %s", (self.worker_id,))
+        cursor.execute("""
+            UPDATE scrape_leases SET leased_until = NOW() + INTERVAL %s SECOND
+            WHERE worker_id = %s AND leased_until >= NOW()
+        """, (self.lease_seconds, self.worker_id))
+        # Forget workers that have been gone for a day
+        cursor.execute("DELETE FROM scrape_workers WHERE heartbeat_at < NOW() - INTERVAL 1 DAY")
+        conn.commit()
+        cursor.close()
+
+    def start_heartbeat(self):
+        self._thread = threading.Thread(target=self._beat, name='scrape-heartbeat', daemon=True)
+        self._thread.start()
+
+    def _beat(self):
+        pool = get_pool()
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                conn = pool.acquire()
+                try:
+                    self.heartbeat(conn)
+                finally:
+                    pool.release(conn)
+            except Exception as e:
+                print(f"Lease heartbeat error: {e}")
+
+    def claim(self, conn, limit, since=None):
+        """Lease up to `limit` unleased sources that are due; return their source_ids.
+
+        A source is due when its interval (news_sources.scrape_interval, or
+        the default) has passed since its last run, or, when `since` is
+        given, when it has not run since then.
+        """
+        cursor = conn.cursor()
+        try:
+            # New sources get their lease row on first sight
+            cursor.execute("""
+                INSERT IGNORE INTO scrape_leases (source_id)
+                SELECT source_id FROM news_sources WHERE active = 1
+            """)
+            conn.commit()
+
+            if since is not None:
+                due = "(f.last_run_at IS NULL OR f.last_run_at < %s)"
+                params = [since]
+            else:
+                due = "(f.last_run_at IS NULL OR f.last_run_at <= NOW() - INTERVAL COALESCE(s.scrape_interval, %s) SECOND)"
+                params = [self.default_interval]
+            conn.start_transaction()
+            cursor.execute(f"""
+                SELECT l.source_id
+                FROM scrape_leases l
+                JOIN news_sources s ON s.source_id = l.source_id
+                LEFT JOIN feed_state f ON f.source_id = l.source_id
+                WHERE s.active = 1 AND (l.leased_until IS NULL OR l.leased_until < NOW()) AND {due}
+                ORDER BY f.last_run_at IS NOT NULL, f.last_run_at, l.source_id
+                LIMIT %s
+                FOR UPDATE OF l SKIP LOCKED
+            """, (*params, limit))
+            source_ids = [row[0] for row in cursor.fetchall()]
+            if source_ids:
+                placeholders = ', '.join(['%s'] * len(source_ids))
+                cursor.execute(f"""
+                    UPDATE scrape_leases
+                    SET worker_id = %s, leased_until = NOW() + INTERVAL %s SECOND, claimed_at = NOW()
+                    WHERE source_id IN ({placeholders})
+                """, (self.worker_id, self.lease_seconds, *source_ids))
+            conn.commit()
+            return source_ids
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def release(self, conn, source_ids):
+        if not source_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(source_ids))
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            UPDATE scrape_leases SET worker_id = NULL, leased_until = NULL
+            WHERE worker_id = %s AND source_id IN ({placeholders})
+        """, (self.worker_id, *source_ids))
+        conn.commit()
+        cursor.close()
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from config import (LIVE_MAX_CONNECTIONS, LIVE_REPLAY_SIZE, LIVE_QUEUE_SIZE, LIVE_POLL_INTERVAL,
+                    LIVE_POLL_OVERLAP)
+from db import get_pool
+
+EVENT_FIELDS = ('headline_id', 'title', 'description', 'url', 'image_url', 'source_name',
+                'category_id', 'category_name', 'publish_date')
+
+
+def headline_event(row, **extra):
+    """Event payload for a headline row (a dict with news_headlines columns)."""
+    event = {field: row.get(field) for field in EVENT_FIELDS}
+    event.update(extra)
+    if isinstance(event['publish_date'], datetime):
+        event['publish_date'] = event['publish_date'].isoformat()
+    return event
+
+
+def format_event(event):
+    """Serialize an event in text/event-stream framing; its id is the headline_id."""
+    data = json.dumps(event, separators=(',', ':'), ensure_ascii=False)
+    return f"id: {event['headline_id']}\nevent: headline\ndata: {data}\n\n"
+
+
+class Subscription:
+    def __init__(self, category_id=None, queue_size=100):
+        self.category_id = category_id
+        self.queue_size = queue_size
+        self.queue = queue.Queue()
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.category_id is None or event['category_id'] == self.category_id
+
+    def put(self, event):
+        self._offer(event)
+
+    def _offer(self, event):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.queue_size:
+            # Too slow: end its stream, it resumes from the replay buffer
+            self.overflowed = True
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait(event)
+
+
+class AsyncSubscription(Subscription):
+    """A subscription read on an asyncio event loop (asgi.py); publish() runs on other threads."""
+
+    def __init__(self, loop, category_id=None, queue_size=100):
+        super().__init__(category_id, queue_size)
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, event):
+        # asyncio.Queue isn't thread-safe, not even qsize(): check it on the loop
+        self.loop.call_soon_threadsafe(self._offer, event)
+
+
+class HeadlineHub:
+    """In-process pub/sub of newly ingested headlines for the live stream.
+
+    The scraper publishes each headline once its insert commits. Events are
+    kept in a replay buffer so a reconnecting client (Last-Event-ID is the
+    newest headline_id it saw) gets what it missed. A subscriber that falls
+    `queue_size` events behind is dropped and reconnects through the replay
+    buffer instead of buffering without bound.
+
+    Headlines scraped by another process never reach this hub directly, so
+    while anyone is subscribed a poller looks for newly stored headlines
+    every `poll_interval` seconds: one query per process rather than per
+    client.
+    """
+
+    def __init__(self, max_connections=8, replay_size=200, queue_size=100, poll_interval=5,
+                 poll_overlap=60):
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.poll_overlap = poll_overlap
+        self._buffer = deque(maxlen=replay_size)
+        self._seen = set()
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._poll_since = None
+        self._poll_ids = set()
+        self._poller = None
+        self._stats = {'published': 0, 'dropped': 0, 'rejected': 0}
+
+    def publish(self, events):
+        """Deliver events to subscribers; headlines already published are ignored."""
+        with self._lock:
+            for event in sorted(events, key=lambda e: e['headline_id']):
+                headline_id = event['headline_id']
+                if headline_id in self._seen:
+                    continue
+                if len(self._buffer) == self._buffer.maxlen:
+                    self._seen.discard(self._buffer[0]['headline_id'])
+                self._buffer.append(event)
+                self._seen.add(headline_id)
+                self._stats['published'] += 1
+                for sub in list(self._subscribers):
+                    if sub.overflowed:
+                        self._remove(sub)
+                        continue
+                    if not sub.wants(event):
+                        continue
+                    try:
+                        sub.put(event)
+                    except RuntimeError:
+                        # Its event loop has closed (worker shutting down)
+                        self._remove(sub)
+                        continue
+                    if sub.overflowed:
+                        self._remove(sub)
+
+    def _remove(self, sub):
+        # Caller holds self._lock
+        if sub in self._subscribers:
+            self._subscribers.discard(sub)
+            if sub.overflowed:
+                self._stats['dropped'] += 1
+
+    def subscribe(self, category_id=None, last_id=None, loop=None):
+        """Register a client; returns (subscription, missed events) or None when full.
+
+        With an asyncio `loop` the subscription's queue is an asyncio.Queue
+        to await on that loop.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_connections:
+                self._stats['rejected'] += 1
+                return None
+            if loop is not None:
+                sub = AsyncSubscription(loop, category_id, self.queue_size)
+            else:
+                sub = Subscription(category_id, self.queue_size)
+            self._subscribers.add(sub)
+            replay = []
+            if last_id is not None:
+                replay = [e for e in self._buffer if e['headline_id'] > last_id and sub.wants(e)]
+        self._ensure_poller()
+        return sub, replay
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._remove(sub)
+
+    def _ensure_poller(self):
+        if self.poll_interval <= 0 or (self._poller is not None and self._poller.is_alive()):
+            return
+        with self._lock:
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll, name='live-poller', daemon=True)
+                self._poller.start()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._subscribers:
+                    continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Live headline poll error: {e}")
+
+    def poll_once(self):
+        """Publish headlines stored since the previous poll.
+
+        headline_ids are assigned at insert but become visible at commit, so
+        a scraper's batch can appear after higher ids from another one. Each
+        poll therefore re-reads the last `poll_overlap` seconds of scraped_at
+        and skips the ids the previous poll returned. The first poll only
+        records where to start; headlines this process published itself are
+        skipped by publish().
+        """
+        pool = get_pool()
+        conn = pool.acquire()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT NOW() AS now")
+            now = cursor.fetchone()['now']
+            if self._poll_since is None:
+                self._poll_since = now
+                return 0
+            cursor.execute("""
+                SELECT h.headline_id, h.title, h.description, h.url, h.image_url, s.source_name,
+                       h.category_id, c.category_name, h.publish_date
+                FROM news_headlines h
+                LEFT JOIN news_sources s ON s.source_id = h.source_id
+                LEFT JOIN categories c ON c.category_id = h.category_id
+                WHERE h.scraped_at >= %s - INTERVAL %s SECOND
+                ORDER BY h.headline_id
+            """, (self._poll_since, self.poll_overlap))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            pool.release(conn)
+        new_rows = [row for row in rows if row['headline_id'] not in self._poll_ids]
+        self._poll_since = now
+        self._poll_ids = {row['headline_id'] for row in rows}
+        self.publish([headline_event(row) for row in new_rows])
+        return len(new_rows)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['connections'] = len(self._subscribers)
+            stats['buffered'] = len(self._buffer)
+            stats['last_id'] = self._buffer[-1]['headline_id'] if self._buffer else None
+        stats['max_connections'] = self.max_connections
+        return stats
+
+
+hub = HeadlineHub(LIVE_MAX_CONNECTIONS, LIVE_REPLAY_SIZE, LIVE_QUEUE_SIZE, LIVE_POLL_INTERVAL,
+                 LIVE_POLL_OVERLAP)
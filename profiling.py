@@ -0,0 +1,221 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from config import SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE, PROFILE_SAMPLE_RATE, PROFILE_ROUTES, PROFILE_DIR
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    """Query and template timings collected while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # [sql, seconds] per statement, fetches included
+        self.template_time = 0.0
+        self.profiler = None
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(q[1] for q in self.queries)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Value for the Server-Timing response header (milliseconds)."""
+        return (f"db;dur={self.db_time * 1000:.1f};desc=\"{self.query_count} queries\", "
+                f"tpl;dur={self.template_time * 1000:.1f}, "
+                f"total;dur={self.elapsed() * 1000:.1f}")
+
+
+class ProfiledCursor:
+    """Cursor wrapper that charges execute and fetch time to a RequestProfile."""
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+        self._current = None
+
+    def _timed(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if self._current is not None:
+                self._current[1] += time.perf_counter() - start
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._current = [operation, 0.0]
+        self._profile.queries.append(self._current)
+        return self._timed(self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._current = [operation, 0.0]
+        self._profile.queries.append(self._current)
+        return self._timed(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ProfiledConnection:
+    """Connection wrapper whose cursors report to a RequestProfile."""
+
+    def __init__(self, conn, profile):
+        self.raw = conn
+        self._profile = profile
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self.raw.cursor(*args, **kwargs), self._profile)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class LatencyHistogram:
+    """Cumulative-bucket histogram of request durations for one route."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = 0
+        self.errors = 0
+
+    def observe(self, seconds, profile, status):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.db_time += profile.db_time
+        self.template_time += profile.template_time
+        self.queries += profile.query_count
+        if status >= 500:
+            self.errors += 1
+
+
+class RequestMetrics:
+    """Per-route latency histograms and a ring buffer of recent slow queries."""
+
+    def __init__(self, slow_query_ms=200, slow_log_size=100):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self._routes = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, profile):
+        elapsed = profile.elapsed()
+        slow = [(sql, seconds) for sql, seconds in profile.queries if seconds >= self.slow_query_seconds]
+        with self._lock:
+            histogram = self._routes.get((route, method))
+            if histogram is None:
+                histogram = self._routes[(route, method)] = LatencyHistogram()
+            histogram.observe(elapsed, profile, status)
+            for sql, seconds in slow:
+                self._slow.append({
+                    'route': route,
+                    'ms': round(seconds * 1000, 1),
+                    'sql': _WHITESPACE_RE.sub(' ', sql).strip(),
+                    'at': time.time(),
+                })
+        for sql, seconds in slow:
+            logger.warning("Slow query (%.0f ms) on %s %s: %s",
+                           seconds * 1000, method, route, _WHITESPACE_RE.sub(' ', sql).strip())
+
+    def slow_queries(self):
+        with self._lock:
+            return list(reversed(self._slow))
+
+    def render(self):
+        """Prometheus text exposition of the per-route metrics."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP http_request_duration_seconds Request latency by route.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for (route, method), h in routes:
+                labels = f'route="{route}",method="{method}"'
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {h.total:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {h.count}')
+            for name, attr, kind, help_text in (
+                ('http_request_db_seconds_total', 'db_time', 'counter', 'Time spent in database calls.'),
+                ('http_request_template_seconds_total', 'template_time', 'counter', 'Time spent rendering templates.'),
+                ('http_request_queries_total', 'queries', 'counter', 'SQL statements executed.'),
+                ('http_request_errors_total', 'errors', 'counter', 'Responses with a 5xx status.'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (route, method), h in routes:
+                    lines.append(f'{name}{{route="{route}",method="{method}"}} {getattr(h, attr)}')
+        return '\n'.join(lines) + '\n'
+
+
+def should_profile(route, forced=False):
+    """Decide whether to run cProfile for this request."""
+    if forced:
+        return True
+    if PROFILE_SAMPLE_RATE <= 0:
+        return False
+    if PROFILE_ROUTES and route not in PROFILE_ROUTES:
+        return False
+    return random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_profiler(profile):
+    profile.profiler = cProfile.Profile()
+    profile.profiler.enable()
+
+
+def save_profile(profile, endpoint):
+    """Stop the request's profiler and write its stats to PROFILE_DIR.
+
+    Open the .prof file with `python -m pstats` or snakeviz.
+    """
+    profile.profiler.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(
+        PROFILE_DIR,
+        f"{endpoint or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}-{profile.elapsed() * 1000:.0f}ms.prof"
+    )
+    profile.profiler.dump_stats(path)
+    profile.profiler = None
+    return path
+
+
+metrics = RequestMetrics(SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE)
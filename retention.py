@@ -0,0 +1,342 @@
+import csv
+import glob
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from config import (ARCHIVE_DIR, VISIT_RETENTION_MONTHS, HEADLINE_RETENTION_DAYS,
+                    PARTITION_MONTHS_AHEAD, RETENTION_BATCH_SIZE)
+from db import get_pool
+from cache import invalidate_headlines
+from rollups import rollup_visits, rolled_up_to, rebuild_category_counts
+
+# MySQL named lock so only one process runs retention at a time
+RETENTION_LOCK_NAME = 'retention'
+
+VISIT_COLUMNS = ('id', 'user_id', 'ip_address', 'visited_page', 'visited_at')
+HEADLINE_COLUMNS = ('headline_id', 'title', 'description', 'url', 'image_url',
+                    'source_id', 'category_id', 'publish_date', 'scraped_at')
+STORY_SOURCE_COLUMNS = ('headline_id', 'source_id', 'url', 'linked_at')
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def add_months(d, months):
+    years, month = divmod(d.month - 1 + months, 12)
+    return date(d.year + years, month + 1, 1)
+
+
+def parse_bound(value):
+    """Partition upper bound from information_schema ("'2026-11-01 00:00:00'"), or None for MAXVALUE."""
+    value = value.strip("'")
+    return None if value == 'MAXVALUE' else datetime.fromisoformat(value).date()
+
+
+def list_partitions(cursor, table):
+    """Return [(partition_name, upper_bound)] for a RANGE-partitioned table, oldest first."""
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    return [(name, parse_bound(bound)) for name, bound in cursor.fetchall()]
+
+
+def ensure_partitions(conn, table='visit_logs', months_ahead=PARTITION_MONTHS_AHEAD):
+    """Split p_future so every month up to `months_ahead` from now has its own partition.
+
+    Returns the names of the partitions added.
+    """
+    cursor = conn.cursor()
+    try:
+        partitions = list_partitions(cursor, table)
+        bounds = [bound for _, bound in partitions if bound is not None]
+        if not bounds:
+            return []
+        target = add_months(month_start(date.today()), months_ahead + 1)
+        added = []
+        bound = max(bounds)
+        while bound < target:
+            added.append((f"p{bound:%Y%m}", add_months(bound, 1)))
+            bound = add_months(bound, 1)
+        if added:
+            # p_future is empty in normal operation, so this only rewrites metadata
+            definitions = ', '.join(f"PARTITION {name} VALUES LESS THAN ('{upper:%Y-%m-%d}')"
+                                    for name, upper in added)
+            cursor.execute(f"""
+                ALTER TABLE {table} REORGANIZE PARTITION p_future INTO (
+                    {definitions}, PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+        return [name for name, _ in added]
+    finally:
+        cursor.close()
+
+
+def archive_path(table, label):
+    directory = os.path.join(ARCHIVE_DIR, table)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{table}-{label}.csv.gz")
+
+
+def write_archive(conn, query, params, path, columns):
+    """Stream a query's rows into a gzip CSV; the file appears only once complete."""
+    cursor = conn.cursor(buffered=False)
+    tmp = path + '.tmp'
+    count = 0
+    try:
+        cursor.execute(query, params)
+        with gzip.open(tmp, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            while True:
+                rows = cursor.fetchmany(RETENTION_BATCH_SIZE)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                count += len(rows)
+    finally:
+        cursor.close()
+    os.replace(tmp, path)
+    return count
+
+
+def archive_visit_partitions(conn, retention_months=VISIT_RETENTION_MONTHS):
+    """Archive and drop visit_logs partitions older than `retention_months` whole months.
+
+    Rows are folded into visit_hourly first, so visit trends keep their
+    history. Returns {partition_name: rows_archived}.
+    """
+    cutoff = add_months(month_start(date.today()), -retention_months)
+    cursor = conn.cursor()
+    archived = {}
+    try:
+        partitions = list_partitions(cursor, 'visit_logs')
+        expired = [(name, bound) for name, bound in partitions if bound is not None and bound <= cutoff]
+        if not expired:
+            return archived
+
+        rollup_visits(conn)
+        final_to = rolled_up_to(cursor)
+
+        for name, bound in expired:
+            # Every visit in the partition is before its bound
+            if final_to is None or datetime.combine(bound, datetime.min.time()) > final_to:
+                print(f"Skipping {name}: not rolled up yet")
+                break
+            if name == partitions[0][0]:
+                # The first partition holds everything before its bound
+                label = f"before-{bound:%Y-%m}"
+            else:
+                label = f"{add_months(bound, -1):%Y-%m}"
+            archived[name] = write_archive(
+                conn,
+                f"SELECT {', '.join(VISIT_COLUMNS)} FROM visit_logs PARTITION ({name}) ORDER BY visited_at DESC, id DESC",
+                (), archive_path('visit_logs', label), VISIT_COLUMNS
+            )
+            cursor.execute(f"ALTER TABLE visit_logs DROP PARTITION {name}")
+            print(f"Archived {archived[name]} visits from {name}")
+        return archived
+    finally:
+        cursor.close()
+
+
+def stage_archive_rows(table, rows_by_label, columns):
+    """Write each label's rows to a temp gzip next to its archive.
+
+    Returns [(temp_path, archive_path)] for append_staged() to add once the
+    rows are gone from the database.
+    """
+    staged = []
+    try:
+        for label, rows in rows_by_label.items():
+            path = archive_path(table, label)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                                       prefix=os.path.basename(path) + '.', suffix='.tmp')
+            staged.append((tmp, path))
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                if not os.path.exists(path):
+                    writer.writerow(columns)
+                writer.writerows(rows)
+    except Exception:
+        discard_staged(staged)
+        raise
+    return staged
+
+
+def append_staged(staged):
+    """Append staged temp files to their archives.
+
+    Each temp file is a complete gzip member; gzip.open reads concatenated
+    members back as one stream.
+    """
+    for tmp, path in staged:
+        with open(tmp, 'rb') as src, open(path, 'ab') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(tmp)
+
+
+def discard_staged(staged):
+    for tmp, _ in staged:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+
+
+def archive_old_headlines(conn, retention_days=HEADLINE_RETENTION_DAYS):
+    """Move headlines older than `retention_days` that nobody has favorited to the archive.
+
+    news_headlines is not partitioned: MySQL partitioning would require
+    dropping its foreign keys and the global unique url_hash key the scraper
+    relies on. Old rows are removed in batches instead, appended to one
+    gzip CSV per publish month, with the story_sources rows the delete
+    cascades to archived alongside. A batch reaches the archive only after
+    its DELETE commits. Returns the number of headlines archived.
+    """
+    cursor = conn.cursor()
+    total = 0
+    try:
+        while True:
+            # Locking the rows keeps new favorites of them waiting until we commit
+            cursor.execute(f"""
+                SELECT {', '.join('h.' + c for c in HEADLINE_COLUMNS)}
+                FROM news_headlines h
+                WHERE h.publish_date < NOW() - INTERVAL %s DAY
+                  AND NOT EXISTS (SELECT 1 FROM favorites f WHERE f.headline_id = h.headline_id)
+                ORDER BY h.publish_date, h.headline_id
+                LIMIT %s
+                FOR UPDATE
+            """, (retention_days, RETENTION_BATCH_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.commit()
+                break
+
+            ids = [row[0] for row in rows]
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f"""
+                SELECT {', '.join(STORY_SOURCE_COLUMNS)}
+                FROM story_sources WHERE headline_id IN ({placeholders})
+            """, ids)
+            source_rows = cursor.fetchall()
+
+            # Re-check favorites: one committed since the SELECT's snapshot keeps its headline
+            cursor.execute(f"""
+                DELETE FROM news_headlines
+                WHERE headline_id IN ({placeholders})
+                  AND headline_id NOT IN (SELECT headline_id FROM favorites)
+            """, ids)
+            deleted = cursor.rowcount
+            if deleted < len(ids):
+                cursor.execute(f"SELECT headline_id FROM news_headlines WHERE headline_id IN ({placeholders})", ids)
+                kept = {r[0] for r in cursor.fetchall()}
+                rows = [row for row in rows if row[0] not in kept]
+                source_rows = [row for row in source_rows if row[0] not in kept]
+
+            month = {row[0]: f"{row[7]:%Y-%m}" for row in rows}
+            headlines_by_month, sources_by_month = {}, {}
+            for row in rows:
+                headlines_by_month.setdefault(month[row[0]], []).append(row)
+            for row in source_rows:
+                sources_by_month.setdefault(month[row[0]], []).append(row)
+
+            staged = []
+            try:
+                staged += stage_archive_rows('news_headlines', headlines_by_month, HEADLINE_COLUMNS)
+                staged += stage_archive_rows('story_sources', sources_by_month, STORY_SOURCE_COLUMNS)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                discard_staged(staged)
+                raise
+            append_staged(staged)
+            total += deleted
+    finally:
+        cursor.close()
+    if total:
+        rebuild_category_counts(conn)
+        invalidate_headlines()
+    return total
+
+
+def run_retention():
+    """Add upcoming partitions and archive expired data (called by the scheduler)."""
+    pool = get_pool()
+    conn = pool.acquire()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (RETENTION_LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            return None
+        try:
+            added = ensure_partitions(conn)
+            visits = archive_visit_partitions(conn)
+            headlines = archive_old_headlines(conn)
+            return {'partitions_added': added, 'visits_archived': visits, 'headlines_archived': headlines}
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (RETENTION_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+        pool.release(conn)
+
+
+# ==================== ARCHIVE READER ====================
+def archive_files(table):
+    """Return [(first_month or None, end_bound, path)] for a table's archives, newest first."""
+    files = []
+    for path in glob.glob(os.path.join(ARCHIVE_DIR, table, f"{table}-*.csv.gz")):
+        label = os.path.basename(path)[len(table) + 1:-len('.csv.gz')]
+        try:
+            if label.startswith('before-'):
+                first, end = None, datetime.strptime(label[len('before-'):], '%Y-%m').date()
+            else:
+                first = datetime.strptime(label, '%Y-%m').date()
+                end = add_months(first, 1)
+        except ValueError:
+            continue
+        files.append((first, end, path))
+    files.sort(key=lambda f: f[1], reverse=True)
+    return files
+
+
+def iter_archive(table, date_column, start=None, end=None):
+    """Yield archived rows (dicts of strings) with start <= date_column < end, newest file first.
+
+    Files outside the range are skipped without being opened.
+    """
+    for first, bound, path in archive_files(table):
+        if end is not None and first is not None and first >= end.date():
+            continue
+        if start is not None and bound <= start.date():
+            continue
+        with gzip.open(path, 'rt', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                value = datetime.fromisoformat(row[date_column]) if row[date_column] else None
+                if value is None or (start is not None and value < start) or (end is not None and value >= end):
+                    continue
+                yield row
+
+
+def iter_archived_visits(start=None, end=None):
+    """Archived visit_logs rows as tuples in VISIT_COLUMNS order, newest first."""
+    for row in iter_archive('visit_logs', 'visited_at', start, end):
+        yield (
+            int(row['id']),
+            int(row['user_id']) if row['user_id'] else None,
+            row['ip_address'],
+            row['visited_page'],
+            datetime.fromisoformat(row['visited_at']),
+        )
+
+
+if __name__ == "__main__":
+    # Run retention once, e.g. from cron
+    print(run_retention())
@@ -0,0 +1,141 @@
+from config import VISIT_ROLLUP_LAG_SECONDS
+from db import get_pool
+
+# MySQL named lock so only one process advances the visit rollup at a time
+ROLLUP_LOCK_NAME = 'visit_rollup'
+
+
+def hour_start(dt):
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def rebuild_category_counts(conn):
+    """Recompute category_counts from news_headlines.
+
+    Ingest keeps the counters current; this corrects any drift (e.g. after
+    headlines are deleted) with one full scan.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO category_counts (category_id, headline_count)
+            SELECT c.category_id, COUNT(h.headline_id)
+            FROM categories c
+            LEFT JOIN news_headlines h ON h.category_id = c.category_id
+            GROUP BY c.category_id
+            ON DUPLICATE KEY UPDATE headline_count = VALUES(headline_count)
+        """)
+        cursor.execute("""
+            INSERT INTO rollup_state (name, rolled_up_to) VALUES ('category_counts', NOW())
+            ON DUPLICATE KEY UPDATE rolled_up_to = VALUES(rolled_up_to)
+        """)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def ensure_category_counts(conn):
+    """Build category_counts once if it has never been rebuilt.
+
+    A database upgraded with headlines already in it starts with zeroed
+    counters; the first scheduler to start fills them in. Returns True if
+    it rebuilt them.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM rollup_state WHERE name = 'category_counts'")
+        if cursor.fetchone() is not None:
+            return False
+    finally:
+        cursor.close()
+    rebuild_category_counts(conn)
+    return True
+
+
+def rolled_up_to(cursor):
+    """End of the last final visit_hourly hour, or None before the first rollup."""
+    cursor.execute("SELECT rolled_up_to FROM rollup_state WHERE name = 'visit_hourly'")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def rollup_visits(conn, lag=VISIT_ROLLUP_LAG_SECONDS):
+    """Recompute visit_hourly for every hour that is not final yet.
+
+    visit_logs ids do not arrive in order (each process's VisitLogger
+    commits its own batches, stamped with the time of the visit), so
+    progress is tracked by time: rollup_state.rolled_up_to is the end of the
+    last hour that ended more than `lag` seconds ago, and is final. Each run
+    replaces the counts of the hours from there on, the current partial hour
+    included. Returns the number of visits in the recomputed hours.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (ROLLUP_LOCK_NAME,))
+        if cursor.fetchone()[0] != 1:
+            return 0
+        try:
+            start = rolled_up_to(cursor)
+            if start is None:
+                cursor.execute("SELECT MIN(visited_at) FROM visit_logs")
+                first = cursor.fetchone()[0]
+                if first is None:
+                    return 0
+                start = hour_start(first)
+            cursor.execute("SELECT NOW() - INTERVAL %s SECOND", (lag,))
+            final_to = hour_start(cursor.fetchone()[0])
+
+            cursor.execute("""
+                INSERT INTO visit_hourly (hour_start, visited_page, visits)
+                SELECT DATE_FORMAT(visited_at, '%Y-%m-%d %H:00:00'), COALESCE(visited_page, ''), COUNT(*)
+                FROM visit_logs
+                WHERE visited_at >= %s
+                GROUP BY 1, 2
+                ON DUPLICATE KEY UPDATE visits = VALUES(visits)
+            """, (start,))
+            cursor.execute("SELECT COALESCE(SUM(visits), 0) FROM visit_hourly WHERE hour_start >= %s", (start,))
+            visits = int(cursor.fetchone()[0])
+            if final_to > start:
+                cursor.execute("""
+                    INSERT INTO rollup_state (name, rolled_up_to) VALUES ('visit_hourly', %s)
+                    ON DUPLICATE KEY UPDATE rolled_up_to = VALUES(rolled_up_to)
+                """, (final_to,))
+            conn.commit()
+            return visits
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (ROLLUP_LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def run_rollups():
+    """Advance the visit rollup on a pooled connection (called by the scheduler)."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        return rollup_visits(conn)
+    finally:
+        pool.release(conn)
+
+
+def get_visit_trends(cursor, days=30):
+    """Daily visit totals and top pages over the last `days`, from visit_hourly."""
+    cursor.execute("""
+        SELECT DATE(hour_start) AS day, SUM(visits) AS visits
+        FROM visit_hourly
+        WHERE hour_start >= CURDATE() - INTERVAL %s DAY
+        GROUP BY day
+        ORDER BY day
+    """, (days,))
+    daily = cursor.fetchall()
+    cursor.execute("""
+        SELECT visited_page, SUM(visits) AS visits
+        FROM visit_hourly
+        WHERE hour_start >= CURDATE() - INTERVAL %s DAY
+        GROUP BY visited_page
+        ORDER BY visits DESC
+        LIMIT 10
+    """, (days,))
+    pages = cursor.fetchall()
+    return {'daily': daily, 'pages': pages}
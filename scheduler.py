@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+
+from config import (SCHEDULER_TICK, SCRAPE_INTERVAL, SCRAPE_BATCH_SIZE,
+                    SCRAPE_LEASE_SECONDS, SCRAPE_HEARTBEAT_INTERVAL, RETENTION_INTERVAL)
+from db import get_pool
+from scraper import scrape_all_sources
+from rollups import run_rollups, ensure_category_counts
+from retention import run_retention
+from leases import SourceLeases, new_worker_id
+
+
+class ScrapeScheduler:
+    """Runs scrapes in a background thread instead of inside a request.
+
+    Every `tick` seconds the thread takes any pending job queued by /scrape
+    (all sources) and then keeps leasing batches of due sources until none
+    are left, then advances the visit rollup and, every RETENTION_INTERVAL
+    seconds, the partition/retention job. Any number of web workers or
+    standalone `python scheduler.py` processes, on any host, can run a
+    scheduler; source leases (see leases.py) give each source to exactly
+    one of them at a time.
+    """
+
+    def __init__(self, tick=30, default_interval=900, batch_size=50,
+                 lease_seconds=120, heartbeat_interval=30):
+        self.tick = tick
+        self.default_interval = default_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.leases = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        # Start lazily, and again after a fork, so each gunicorn worker has its own thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.leases = SourceLeases(new_worker_id(), self.lease_seconds,
+                                       self.heartbeat_interval, self.default_interval)
+            self.leases.start_heartbeat()
+            self._thread = threading.Thread(target=self._run, name='scrape-scheduler', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, conn, user_id=None):
+        """Queue a scrape of all sources and return its job_id."""
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO scrape_jobs (requested_by) VALUES (%s)", (user_id,))
+        job_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+        self._wake.set()
+        return job_id
+
+    def _run(self):
+        while True:
+            try:
+                conn = get_pool().acquire()
+                try:
+                    self.leases.register(conn)
+                    # Databases upgraded with existing headlines start with zeroed counters
+                    if ensure_category_counts(conn):
+                        print("Built category_counts from existing headlines")
+                finally:
+                    get_pool().release(conn)
+                break
+            except Exception as e:
+                print(f"Scheduler registration error: {e}")
+                self._wake.wait(self.tick)
+        next_retention = time.monotonic()
+        while True:
+            self._wake.wait(self.tick)
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Scheduler error: {e}")
+            try:
+                run_rollups()
+            except Exception as e:
+                print(f"Visit rollup error: {e}")
+            if RETENTION_INTERVAL and time.monotonic() >= next_retention:
+                next_retention = time.monotonic() + RETENTION_INTERVAL
+                try:
+                    run_retention()
+                except Exception as e:
+                    print(f"Retention error: {e}")
+
+    def _claim_jobs(self, conn):
+        """Take every pending job; return (job_ids, database time they were taken)."""
+        cursor = conn.cursor()
+        try:
+            # Jobs whose worker stopped heartbeating were interrupted
+            cursor.execute("""
+                UPDATE scrape_jobs j
+                LEFT JOIN scrape_workers w ON w.worker_id = j.worker_id
+                SET j.status = 'failed', j.finished_at = NOW(), j.error = 'Interrupted'
+                WHERE j.status = 'running'
+                  AND (w.heartbeat_at IS NULL OR w.heartbeat_at < NOW() - INTERVAL %s SECOND)
+            """, (self.lease_seconds,))
+            conn.commit()
+            conn.start_transaction()
+            cursor.execute("SELECT NOW()")
+            started = cursor.fetchone()[0]
+            cursor.execute("SELECT job_id FROM scrape_jobs WHERE status = 'pending' FOR UPDATE SKIP LOCKED")
+            job_ids = [row[0] for row in cursor.fetchall()]
+            if job_ids:
+                # Several clicks while waiting collapse into one run
+                placeholders = ', '.join(['%s'] * len(job_ids))
+                cursor.execute(f"""
+                    UPDATE scrape_jobs SET status = 'running', started_at = %s, worker_id = %s
+                    WHERE job_id IN ({placeholders})
+                """, (started, self.leases.worker_id, *job_ids))
+            conn.commit()
+            return job_ids, started
+        finally:
+            cursor.close()
+
+    def _scrape_batches(self, conn, since=None):
+        """Lease and scrape batches of due sources until none are left."""
+        total_new, done = 0, set()
+        while True:
+            source_ids = self.leases.claim(conn, self.batch_size, since)
+            # A source whose result could not be recorded would stay due; don't loop on it
+            if not source_ids or done.issuperset(source_ids):
+                self.leases.release(conn, source_ids)
+                return total_new
+            try:
+                total_new += scrape_all_sources(source_ids)
+            finally:
+                self.leases.release(conn, source_ids)
+            done.update(source_ids)
+
+    def run_once(self):
+        """Run pending jobs and scrape this worker's share of the due sources.
+
+        Returns the number of new headlines, or None if nothing ran.
+        """
+        pool = get_pool()
+        conn = pool.acquire()
+        try:
+            job_ids, started = self._claim_jobs(conn)
+            new_headlines, error = 0, None
+            try:
+                if job_ids:
+                    # Everything not scraped since the job started, whatever its interval
+                    new_headlines += self._scrape_batches(conn, since=started)
+                new_headlines += self._scrape_batches(conn)
+            except Exception as e:
+                error = str(e)[:500]
+                print(f"Error scraping news: {e}")
+
+            if job_ids:
+                placeholders = ', '.join(['%s'] * len(job_ids))
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    UPDATE scrape_jobs SET status = %s, finished_at = NOW(), new_headlines = %s, error = %s
+                    WHERE job_id IN ({placeholders})
+                """, ('failed' if error else 'done', new_headlines, error, *job_ids))
+                conn.commit()
+                cursor.close()
+            return new_headlines or None
+        finally:
+            pool.release(conn)
+
+
+def get_scrape_status(cursor):
+    """Return per-source results and leases, the live workers and the recent jobs."""
+    cursor.execute("""
+        SELECT s.source_name, s.active, f.last_run_at, f.last_duration, f.last_new, f.last_error, f.checked_at,
+               l.worker_id AS leased_by, l.leased_until
+        FROM news_sources s
+        LEFT JOIN feed_state f ON f.source_id = s.source_id
+        LEFT JOIN scrape_leases l ON l.source_id = s.source_id AND l.leased_until >= NOW()
+        ORDER BY s.source_name
+    """)
+    sources = cursor.fetchall()
+    cursor.execute("""
+        SELECT job_id, requested_by, status, requested_at, started_at, finished_at, new_headlines, error
+        FROM scrape_jobs
+        ORDER BY job_id DESC
+        LIMIT 10
+    """)
+    jobs = cursor.fetchall()
+    cursor.execute("""
+        SELECT w.worker_id, w.hostname, w.pid, w.started_at, w.heartbeat_at, COUNT(l.source_id) AS leases
+        FROM scrape_workers w
+        LEFT JOIN scrape_leases l ON l.worker_id = w.worker_id AND l.leased_until >= NOW()
+        WHERE w.heartbeat_at >= NOW() - INTERVAL %s SECOND
+        GROUP BY w.worker_id, w.hostname, w.pid, w.started_at, w.heartbeat_at
+        ORDER BY w.worker_id
+    """, (SCRAPE_LEASE_SECONDS,))
+    workers = cursor.fetchall()
+    return {'sources': sources, 'jobs': jobs, 'workers': workers}
+
+
+scheduler = ScrapeScheduler(
+    tick=SCHEDULER_TICK,
+    default_interval=SCRAPE_INTERVAL,
+    batch_size=SCRAPE_BATCH_SIZE,
+    lease_seconds=SCRAPE_LEASE_SECONDS,
+    heartbeat_interval=SCRAPE_HEARTBEAT_INTERVAL,
+)
+
+if __name__ == "__main__":
+    # Run a standalone scrape worker; start more (on any host) to share the sources
+    scheduler.ensure_started()
+    while True:
+        time.sleep(3600)
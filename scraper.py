@@ -1,156 +1,428 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import hashlib
+import time
+from lxml import etree
+from html import unescape
+import io
+import re
 import mysql.connector
 from datetime import datetime
-from config import DB_CONFIG
+from config import (SCRAPE_CONCURRENCY, SCRAPE_TIMEOUT, SCRAPE_HOST_TIMEOUTS,
+                    SCRAPE_RETRIES, SCRAPE_RETRY_BACKOFF, DEDUP_ENABLED,
+                    IMAGE_PROXY_ENABLED, IMAGE_PREFETCH)
+from db import get_pool
+from classifier import classifier
+from cache import invalidate_headlines
+from dedup import headline_signature, pack_signature, load_dedup_index
+from images import prefetch_thumbnails
+from live import hub, headline_event
 
 def get_db_connection():
-    """Create database connection"""
-    return mysql.connector.connect(**DB_CONFIG)
+    """Check a connection out of the shared pool"""
+    return get_pool().acquire()
 
-def get_source_id(conn, source_name):
-    """Get source_id from database"""
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """Shared keep-alive HTTP session with retry/backoff for feed requests"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                session.headers["User-Agent"] = "Mozilla/5.0"
+                retry = Retry(total=SCRAPE_RETRIES, backoff_factor=SCRAPE_RETRY_BACKOFF,
+                              status_forcelist=(429, 500, 502, 503, 504),
+                              allowed_methods=("GET",))
+                adapter = HTTPAdapter(max_retries=retry, pool_connections=SCRAPE_CONCURRENCY,
+                                      pool_maxsize=SCRAPE_CONCURRENCY)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _http_session = session
+    return _http_session
+
+def get_timeout(url):
+    """Return the request timeout for a feed, honouring per-host overrides"""
+    return SCRAPE_HOST_TIMEOUTS.get(urlparse(url).hostname, SCRAPE_TIMEOUT)
+
+def fetch_feed(url, state=None):
+    """Download a feed body (runs in the fetch thread pool)
+
+    `state` is the feed's saved validators from load_feed_states(). Returns
+    (body, new_state); body is the raw response bytes, or None when the
+    server answered 304 or the content hash is unchanged, so the caller can
+    skip parsing. new_state should be saved either way, since an unchanged
+    200 response may still carry a new ETag or Last-Modified.
+    """
+    state = dict(state or {})
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    
+    r = get_http_session().get(url, headers=headers, timeout=get_timeout(url))
+    if r.status_code == 304:
+        return None, state
+    r.raise_for_status()
+    
+    content_hash = hashlib.sha256(r.content).hexdigest()
+    unchanged = content_hash == state.get("content_hash")
+    state.update(
+        etag=r.headers.get("ETag"),
+        last_modified=r.headers.get("Last-Modified"),
+        content_hash=content_hash,
+    )
+    return (None if unchanged else r.content), state
+
+def load_feed_states(conn, source_ids=None):
+    """Load saved conditional-request validators keyed by source_id"""
+    cursor = conn.cursor(dictionary=True)
+    query = "SELECT source_id, etag, last_modified, content_hash FROM feed_state"
+    if source_ids:
+        query += f" WHERE source_id IN ({', '.join(['%s'] * len(source_ids))})"
+    cursor.execute(query, tuple(source_ids or ()))
+    states = {row["source_id"]: row for row in cursor.fetchall()}
+    cursor.close()
+    return states
+
+def save_feed_state(conn, source_id, state):
+    """Persist a feed's validators after it has been processed"""
     cursor = conn.cursor()
-    cursor.execute("SELECT source_id FROM news_sources WHERE source_name = %s", (source_name,))
-    result = cursor.fetchone()
+    cursor.execute("""
+        INSERT INTO feed_state (source_id, etag, last_modified, content_hash, checked_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE etag = VALUES(etag), last_modified = VALUES(last_modified),
+            content_hash = VALUES(content_hash), checked_at = VALUES(checked_at)
+    """, (source_id, state.get("etag"), state.get("last_modified"), state.get("content_hash")))
+    conn.commit()
     cursor.close()
-    return result[0] if result else None
 
 def detect_category(title, description):
     """Detect category based on keywords in title and description"""
-    text = (title + " " + description).lower()
-    
-    # Category keywords mapping
-    categories = {
-        'Politics': ['election', 'government', 'minister', 'parliament', 'politics', 'political', 'congress', 'bjp', 'vote', 'pm', 'president'],
-        'Technology': ['tech', 'technology', 'ai', 'software', 'hardware', 'computer', 'app', 'digital', 'cyber', 'internet', 'smartphone', 'gadget'],
-        'Sports': ['cricket', 'football', 'sports', 'match', 'player', 'ipl', 'fifa', 'olympics', 'tournament', 'champion', 'goal', 'score'],
-        'Business': ['business', 'economy', 'market', 'stock', 'finance', 'company', 'corporate', 'industry', 'trade', 'investment', 'rupee', 'revenue'],
-        'Entertainment': ['movie', 'film', 'actor', 'actress', 'bollywood', 'hollywood', 'music', 'celebrity', 'entertainment', 'show', 'series'],
-        'Health': ['health', 'medical', 'doctor', 'hospital', 'disease', 'vaccine', 'covid', 'medicine', 'treatment', 'patient'],
-        'Science': ['science', 'research', 'study', 'scientist', 'space', 'nasa', 'isro', 'discovery', 'experiment'],
-        'World': ['world', 'international', 'global', 'country', 'nation', 'usa', 'china', 'europe', 'war', 'peace'],
-        'Education': ['education', 'school', 'college', 'university', 'student', 'exam', 'admission', 'degree', 'learning']
-    }
-    
-    # Check each category
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword in text:
-                return category
-    
-    return 'General'  # Default category
+    return classifier.classify(title, description or "")
 
-def get_category_id(conn, category_name):
-    """Get category_id from database"""
+def get_category_map(conn):
+    """Map every category_name to its category_id in one query"""
     cursor = conn.cursor()
-    cursor.execute("SELECT category_id FROM categories WHERE category_name = %s", (category_name,))
-    result = cursor.fetchone()
+    cursor.execute("SELECT category_name, category_id FROM categories")
+    result = dict(cursor.fetchall())
     cursor.close()
-    return result[0] if result else 1  # Return 1 (General) if not found
+    return result
 
-def insert_headline(conn, title, description, url, image_url, source_id, category_id, publish_date):
-    """Insert news headline into database"""
-    cursor = conn.cursor()
+def increment_category_counts(cursor, counts):
+    """Add newly inserted headlines to the category_counts counters
+
+    `counts` maps category_id -> number of new headlines. Runs on the
+    caller's cursor so it commits with the inserts.
+    """
+    if not counts:
+        return
+    cursor.executemany("""
+        INSERT INTO category_counts (category_id, headline_count) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE headline_count = headline_count + VALUES(headline_count)
+    """, list(counts.items()))
+
+def insert_headlines(conn, rows, dedup_index=None):
+    """Insert a feed's headlines in one transaction
+
+    `rows` are dicts with the news_headlines column values. Returns the rows
+    this call inserted, each with its headline_id; URLs already stored are
+    skipped via the url_hash index.
+    With a `dedup_index` (see dedup.load_dedup_index), rows that are near
+    duplicates of a recent story are not stored as headlines; their source
+    and URL are linked to the existing story in story_sources instead.
+    """
+    # Drop repeats within the feed itself
+    unique = {}
+    for row in rows:
+        unique.setdefault(row["url"], row)
+    if not unique:
+        return []
     
-    # Check if headline already exists (avoid duplicates)
-    cursor.execute("SELECT headline_id FROM news_headlines WHERE url = %s", (url,))
-    if cursor.fetchone():
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["UNHEX(SHA2(%s, 256))"] * len(unique))
+        cursor.execute(f"""
+            SELECT url FROM news_headlines WHERE url_hash IN ({placeholders})
+            UNION ALL
+            SELECT url FROM story_sources WHERE url_hash IN ({placeholders})
+        """, list(unique) * 2)
+        existing = {r[0] for r in cursor.fetchall()}
+        new_rows = [row for url, row in unique.items() if url not in existing]
+        
+        for row in new_rows:
+            row["signature"] = headline_signature(row["title"], row["description"])
+        
+        if dedup_index is not None:
+            duplicates = []
+            for row in new_rows:
+                story_id = dedup_index.find(row["signature"])
+                if story_id is not None:
+                    duplicates.append((story_id, row["source_id"], row["url"]))
+            if duplicates:
+                cursor.executemany(
+                    "INSERT IGNORE INTO story_sources (headline_id, source_id, url) VALUES (%s, %s, %s)",
+                    duplicates
+                )
+                duplicate_urls = {url for _, _, url in duplicates}
+                new_rows = [row for row in new_rows if row["url"] not in duplicate_urls]
+        
+        if new_rows:
+            # executemany turns this into a single multi-row INSERT
+            cursor.executemany("""
+                INSERT IGNORE INTO news_headlines (title, description, url, image_url, source_id, category_id, publish_date, minhash)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, [(r["title"], r["description"], r["url"], r["image_url"], r["source_id"],
+                   r["category_id"], r["publish_date"], pack_signature(r["signature"])) for r in new_rows])
+            
+            inserted = []
+            if cursor.rowcount > 0:
+                # A scraper on another lease may have stored some of these URLs
+                # since the check above, so INSERT IGNORE skipped them. Ours
+                # are the rows with ids from this statement's first insert id on.
+                first_id = cursor.lastrowid
+                for headline_id, row in zip(get_headline_ids(conn, new_rows), new_rows):
+                    if headline_id is not None and headline_id >= first_id:
+                        row["headline_id"] = headline_id
+                        inserted.append(row)
+            new_rows = inserted
+            
+            counts = {}
+            for r in new_rows:
+                counts[r["category_id"]] = counts.get(r["category_id"], 0) + 1
+            increment_category_counts(cursor, counts)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
         cursor.close()
-        return False  # Already exists
     
-    # Insert new headline
-    query = """
-        INSERT INTO news_headlines (title, description, url, image_url, source_id, category_id, publish_date)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    # Later feeds in this run can now match these stories
+    if dedup_index is not None:
+        for row in new_rows:
+            dedup_index.add(row["headline_id"], row["signature"])
+    return new_rows
+
+def get_headline_ids(conn, rows):
+    """Look up the headline_id of each row by URL (one query)
+
+    Runs on the caller's connection, so inside insert_headlines it sees
+    that transaction's uncommitted rows.
     """
-    cursor.execute(query, (title, description, url, image_url, source_id, category_id, publish_date))
-    conn.commit()
+    cursor = conn.cursor()
+    placeholders = ", ".join(["UNHEX(SHA2(%s, 256))"] * len(rows))
+    cursor.execute(
+        f"SELECT url, headline_id FROM news_headlines WHERE url_hash IN ({placeholders})",
+        [r["url"] for r in rows]
+    )
+    ids = dict(cursor.fetchall())
     cursor.close()
-    return True
+    return [ids.get(r["url"]) for r in rows]
+
+MAX_ITEMS_PER_FEED = 10
+MAX_DESCRIPTION_LENGTH = 500
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_IMG_SRC_RE = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+
+def strip_tags(html):
+    """Strip HTML tags and unescape entities without building a DOM"""
+    return unescape(_TAG_RE.sub("", html))
+
+def find_image(html):
+    """Return the src of the first <img> in an HTML snippet, if any"""
+    match = _IMG_SRC_RE.search(html)
+    return unescape(match.group(1)) if match else None
 
-def scrape_rss(name, url, conn):
-    """Scrape RSS feed and save to database"""
-    print(f"\n----- Scraping {name} -----")
+def iter_feed_items(body, limit=MAX_ITEMS_PER_FEED):
+    """Stream the first `limit` <item> elements of an RSS body as dicts
+
+    Uses lxml iterparse so parsing stops as soon as enough items have been
+    read, and each item is freed once it has been handled. Child elements
+    are matched by local name, so namespaced feeds work too.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
     
-    try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-        soup = BeautifulSoup(r.text, "xml")
-        items = soup.find_all("item")[:10]  # Get top 10 articles
+    count = 0
+    for _, item in etree.iterparse(io.BytesIO(body), events=("end",), tag="{*}item",
+                                   recover=True, resolve_entities=False):
+        fields = {}
+        for child in item:
+            if not isinstance(child.tag, str):
+                continue  # comments / processing instructions
+            name = etree.QName(child).localname
+            if name == "content" and child.get("url") and "media_url" not in fields:
+                fields["media_url"] = child.get("url")
+            elif name not in fields:
+                fields[name] = "".join(child.itertext())
+        yield fields
         
-        source_id = get_source_id(conn, name)
-        if not source_id:
-            print(f"Source {name} not found in database!")
-            return
+        # Free the item and anything parsed before it
+        item.clear()
+        while item.getprevious() is not None:
+            del item.getparent()[0]
         
-        count = 0
-        for item in items:
-            # Extract data
-            title = item.title.text if item.title else "No title"
-            desc_tag = item.description
-            desc = desc_tag.text if desc_tag else "No description"
-            
-            # Clean description (remove HTML tags if any)
-            desc_soup = BeautifulSoup(desc, "html.parser")
-            desc = desc_soup.get_text()[:500]  # Limit to 500 chars
-            
-            # Get article URL
-            link = item.link.text if item.link else item.guid.text if item.guid else ""
-            
-            # Extract image
-            media = item.find("media:content")
-            if media and media.get("url"):
-                img = media["url"]
-            else:
-                # Try to find image in description
-                img_tag = desc_soup.find("img")
-                img = img_tag["src"] if img_tag and img_tag.get("src") else None
-            
-            # Get publish date
-            pub_date_tag = item.pubDate
-            if pub_date_tag:
-                try:
-                    pub_date = datetime.strptime(pub_date_tag.text, "%a, %d %b %Y %H:%M:%S %z")
-                except:
-                    pub_date = datetime.now()
-            else:
+        count += 1
+        if count >= limit:
+            break
+
+def parse_feed(body, source_id, category_ids):
+    """Parse an RSS body into news_headlines rows (top 10 items)"""
+    rows = []
+    for item in iter_feed_items(body):
+        # Extract data
+        title = item.get("title") or "No title"
+        desc = item.get("description")
+        if desc is None:
+            desc = "No description"
+        
+        # Get article URL
+        link = item.get("link") if "link" in item else item.get("guid", "")
+        
+        # Extract image: media:content first, then an <img> in the description
+        img = item.get("media_url") or find_image(desc)
+        
+        # Clean description (remove HTML tags if any)
+        desc = strip_tags(desc)[:MAX_DESCRIPTION_LENGTH]
+        
+        # Get publish date
+        pub_date_text = item.get("pubDate")
+        if pub_date_text:
+            try:
+                pub_date = datetime.strptime(pub_date_text.strip(), "%a, %d %b %Y %H:%M:%S %z")
+            except ValueError:
                 pub_date = datetime.now()
-            
-            # Detect category
-            category_name = detect_category(title, desc)
-            category_id = get_category_id(conn, category_name)
-            
-            # Insert into database
-            if insert_headline(conn, title, desc, link, img, source_id, category_id, pub_date):
-                count += 1
-                print(f"✓ Added [{category_name}]: {title[:50]}...")
+        else:
+            pub_date = datetime.now()
+        
+        # Detect category
+        category_name = detect_category(title, desc)
         
-        print(f"Total new headlines from {name}: {count}")
+        rows.append({
+            "title": title, "description": desc, "url": link, "image_url": img,
+            "source_id": source_id, "category_id": category_ids.get(category_name, 1),
+            "category_name": category_name, "publish_date": pub_date,
+        })
+    return rows
+
+def ingest_feed(name, conn, body, source_id, category_ids, dedup_index=None):
+    """Parse a feed body and insert its new headlines; raises on failure"""
+    new_rows = insert_headlines(conn, parse_feed(body, source_id, category_ids), dedup_index)
+    for row in new_rows:
+        print(f"✓ Added [{row['category_name']}]: {row['title'][:50]}...")
+    
+    # Push to open live streams (see live.py)
+    hub.publish([headline_event(row, source_name=name) for row in new_rows])
     
-    except Exception as e:
-        print(f"Error scraping {name}: {e}")
-
-def scrape_all_sources():
-    """Main function to scrape all news sources"""
-    news_feeds = {
-        "NDTV": "https://feeds.feedburner.com/ndtvnews-latest",
-        "India Today": "https://www.indiatoday.in/rss/home",
-        "Hindustan Times": "https://www.hindustantimes.com/feeds/rss/latest-news/rssfeed.xml"
-    }
+    if IMAGE_PROXY_ENABLED and IMAGE_PREFETCH:
+        prefetch_thumbnails([row['image_url'] for row in new_rows if row['image_url']])
     
+    count = len(new_rows)
+    print(f"Total new headlines from {name}: {count}")
+    return count
+
+def record_scrape_result(conn, source_id, duration, new_headlines, error=None):
+    """Store the outcome of a source's latest scrape for the status page"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO feed_state (source_id, last_run_at, last_duration, last_new, last_error)
+        VALUES (%s, NOW(), %s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_run_at = VALUES(last_run_at), last_duration = VALUES(last_duration),
+            last_new = VALUES(last_new), last_error = VALUES(last_error)
+    """, (source_id, duration, new_headlines, error[:500] if error else None))
+    conn.commit()
+    cursor.close()
+
+def _timed_fetch(url, state):
+    start = time.monotonic()
+    body, state = fetch_feed(url, state)
+    return body, state, time.monotonic() - start
+
+def load_sources(conn, source_ids=None):
+    """Return the active feeds from news_sources as (source_id, source_name, source_url)."""
+    cursor = conn.cursor()
+    query = "SELECT source_id, source_name, source_url FROM news_sources WHERE active = 1"
+    params = ()
+    if source_ids is not None:
+        if not source_ids:
+            cursor.close()
+            return []
+        query += f" AND source_id IN ({', '.join(['%s'] * len(source_ids))})"
+        params = tuple(source_ids)
+    cursor.execute(query + " ORDER BY source_id", params)
+    sources = cursor.fetchall()
+    cursor.close()
+    return sources
+
+def scrape_all_sources(source_ids=None):
+    """Main function to scrape all news sources
+
+    `source_ids` limits the run to those sources (the scheduler passes the
+    batch it has leased). Returns the number of new headlines inserted.
+    """
     conn = get_db_connection()
     
     print("=" * 50)
     print("Starting News Scraping...")
     print("=" * 50)
     
-    for name, url in news_feeds.items():
-        scrape_rss(name, url, conn)
-    
-    conn.close()
+    try:
+        sources = load_sources(conn, source_ids)
+        category_ids = get_category_map(conn)
+        states = load_feed_states(conn, [source_id for source_id, _, _ in sources])
+        dedup_index = load_dedup_index(conn) if DEDUP_ENABLED else None
+        total_new = 0
+        
+        # Fetch all feeds concurrently; parse and insert on this thread as each arrives
+        with ThreadPoolExecutor(max_workers=SCRAPE_CONCURRENCY) as executor:
+            futures = {executor.submit(_timed_fetch, url, states.get(source_id)): (source_id, name)
+                       for source_id, name, url in sources}
+            for future in as_completed(futures):
+                source_id, name = futures[future]
+                try:
+                    body, state, elapsed = future.result()
+                except Exception as e:
+                    print(f"Error fetching {name}: {e}")
+                    record_scrape_result(conn, source_id, None, 0, f"Fetch failed: {e}")
+                    continue
+                if body is None:
+                    print(f"\n----- {name} unchanged, skipped -----")
+                    # A 200 with the same content can still carry new validators
+                    save_feed_state(conn, source_id, state)
+                    record_scrape_result(conn, source_id, elapsed, 0)
+                    continue
+                
+                print(f"\n----- Scraping {name} -----")
+                start = time.monotonic()
+                try:
+                    count = ingest_feed(name, conn, body, source_id, category_ids, dedup_index)
+                except Exception as e:
+                    print(f"Error scraping {name}: {e}")
+                    record_scrape_result(conn, source_id, elapsed + time.monotonic() - start, 0,
+                                         f"Ingest failed: {e}")
+                    continue
+                save_feed_state(conn, source_id, state)
+                record_scrape_result(conn, source_id, elapsed + time.monotonic() - start, count)
+                total_new += count
+        
+        # Cached pages, counts and stats are stale once new headlines land
+        if total_new:
+            invalidate_headlines()
+    finally:
+        get_pool().release(conn)
     print("\n" + "=" * 50)
     print("Scraping completed!")
     print("=" * 50)
+    return total_new
 
 if __name__ == "__main__":
-    scrape_all_sources()
\ No newline at end of file
+    scrape_all_sources()
@@ -77,4 +77,58 @@ window.addEventListener('scroll', function() {
         const btn = document.querySelector('.scroll-top');
         if (btn) btn.remove();
     }
-});
\ No newline at end of file
+});
+// Live headlines: prepend newly scraped stories to the first page
+function renderLiveCard(h) {
+    const col = document.createElement('div');
+    col.className = 'col-12 col-md-6 col-lg-4 col-xl-3';
+    const card = document.createElement('div');
+    card.className = 'card h-100 shadow-sm border-0 news-card';
+    col.appendChild(card);
+
+    if (h.thumbnail_url) {
+        const ratio = document.createElement('div');
+        ratio.className = 'ratio ratio-16x9';
+        const img = document.createElement('img');
+        img.src = h.thumbnail_url;
+        img.width = 480;
+        img.height = 270;
+        img.loading = 'lazy';
+        img.className = 'card-img-top object-fit-cover';
+        img.alt = h.title;
+        ratio.appendChild(img);
+        card.appendChild(ratio);
+    }
+
+    const body = document.createElement('div');
+    body.className = 'card-body d-flex flex-column';
+    const title = document.createElement('h6');
+    title.className = 'card-title';
+    title.textContent = h.title;
+    const meta = document.createElement('small');
+    meta.className = 'text-muted d-block mb-2';
+    meta.textContent = (h.source_name || 'Source') + ' · just now';
+    body.append(title, meta);
+    if (h.description) {
+        const desc = document.createElement('p');
+        desc.className = 'card-text small text-muted';
+        desc.textContent = h.description;
+        body.appendChild(desc);
+    }
+    const link = document.createElement('a');
+    link.className = 'btn btn-sm btn-primary mt-auto align-self-start';
+    link.target = '_blank';
+    link.href = h.url;
+    link.textContent = 'Read More';
+    body.appendChild(link);
+    card.appendChild(body);
+    return col;
+}
+
+const liveGrid = document.querySelector('[data-live-stream]');
+if (liveGrid && window.EventSource) {
+    const source = new EventSource(liveGrid.dataset.liveStream);
+    source.addEventListener('headline', function(e) {
+        liveGrid.prepend(renderLiveCard(JSON.parse(e.data)));
+    });
+}
@@ -0,0 +1,152 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from config import VISIT_LOG_QUEUE_SIZE, VISIT_LOG_BATCH_SIZE, VISIT_LOG_FLUSH_INTERVAL
+from db import get_pool
+
+
+class VisitLogger:
+    """Buffers visit events in memory and writes them to visit_logs in batches.
+
+    Requests only enqueue an event. A background thread flushes the queue
+    with one multi-row INSERT whenever `batch_size` events are waiting or
+    `flush_interval` seconds have passed. If the queue is full (the database
+    is slower than the traffic) new events are dropped and counted rather
+    than blocking the request.
+
+    visited_at comes from the database clock, the same clock the hourly
+    rollup and retention compare against. Each row is stamped with NOW()
+    minus however long it waited in the queue.
+    """
+
+    def __init__(self, maxsize=10000, batch_size=200, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'written': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'failed_rows': 0,
+        }
+
+    def _ensure_started(self):
+        # Start lazily, again after a fork so each gunicorn worker has its own
+        # writer, and again if the writer thread has died
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='visit-logger', daemon=True)
+            self._thread.start()
+
+    def _running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def log(self, user_id, ip_address, page_name):
+        """Queue a visit without touching the database."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((user_id, ip_address, page_name, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return False
+        with self._lock:
+            self._stats['enqueued'] += 1
+        return True
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Let the batch fill up until it is full or the interval has passed
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        """Insert a batch; any error is counted as a failed batch so the writer keeps running."""
+        now = time.monotonic()
+        rows = [(user_id, ip_address, page_name, int((now - queued_at) * 1000000))
+                for user_id, ip_address, page_name, queued_at in batch]
+        pool = get_pool()
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            self._record_failure(batch, e)
+            return
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            # executemany rewrites this into a single multi-row INSERT
+            cursor.executemany(
+                "INSERT INTO visit_logs (user_id, ip_address, visited_page, visited_at) "
+                "VALUES (%s, %s, %s, NOW() - INTERVAL %s MICROSECOND)",
+                rows
+            )
+            conn.commit()
+            with self._lock:
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+        except Exception as e:
+            self._record_failure(batch, e)
+        finally:
+            if cursor is not None:
+                cursor.close()
+            pool.release(conn)
+
+    def _record_failure(self, batch, error):
+        print(f"Error writing {len(batch)} visit logs: {error}")
+        with self._lock:
+            self._stats['failed_batches'] += 1
+            self._stats['failed_rows'] += len(batch)
+
+    def flush(self):
+        """Write everything currently queued from the calling thread."""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._write(batch)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+
+visit_logger = VisitLogger(
+    maxsize=VISIT_LOG_QUEUE_SIZE,
+    batch_size=VISIT_LOG_BATCH_SIZE,
+    flush_interval=VISIT_LOG_FLUSH_INTERVAL,
+)
+atexit.register(visit_logger.flush)